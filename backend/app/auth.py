@@ -1,3 +1,9 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -5,9 +11,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.database import get_db
+from backend.app.database import get_async_db
 from backend.app.models import User
 from backend.app.schemas.user import UserInDB, TokenData
 
@@ -19,21 +26,82 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so hashing runs on its own threads instead of the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Authenticated users are cached briefly so cheap endpoints skip the user lookup
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+class UserCache:
+    """Thread-safe TTL + LRU cache of detached User rows keyed on (username, token)"""
+    
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return user
+    
+    def put(self, key, user):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, username: str):
+        with self._lock:
+            for key in [key for key in self._data if key[0] == username]:
+                del self._data[key]
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_SIZE)
+
+def invalidate_user(username: str):
+    """Drop cached sessions for a user so the next request reloads it"""
+    user_cache.invalidate(username)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.username)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def get_user(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+async def get_user(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user(db, username)
+    if not user or not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -44,7 +112,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,10 +127,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = get_user(db, username=token_data.username)
+    user = user_cache.get((token_data.username, token))
+    if user is not None:
+        return user
+    
+    user = await get_user(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    # Detach so the cached row can outlive this request's session
+    db.expunge(user)
+    user_cache.put((token_data.username, token), user)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
+    return current_user
+
+async def get_current_recruiter(current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_recruiter:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Recruiter access required")
     return current_user
\ No newline at end of file
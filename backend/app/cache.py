@@ -0,0 +1,171 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Callable
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend.app.models import ScoreCache
+from backend.app.llm import PROMPT_VERSION, iter_compute_job_matches, batch_compute_resume_matches
+from backend.app.providers import get_provider
+from backend.app.metrics import timed, record_stage
+
+# Number of scores kept in the in-process LRU in front of the score_cache table
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", "10000"))
+
+class LRUCache:
+    """Small thread-safe LRU mapping"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+score_cache = LRUCache(SCORE_CACHE_SIZE)
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so formatting-only changes don't miss the cache"""
+    return " ".join((text or "").split())
+
+def text_digest(text: Optional[str]) -> str:
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+def score_cache_key(resume_digest: str, job_description: str) -> str:
+    """Cache key for one resume/job pair under the current provider model and prompt version"""
+    parts = [resume_digest, text_digest(job_description), get_provider().model_name, PROMPT_VERSION]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+def get_cached_scores(db: Session, keys: Iterable[str]) -> Dict[str, float]:
+    """Look keys up in the in-process LRU, then in one query against score_cache"""
+    if not get_provider().cache_scores:
+        return {}
+    found = {}
+    missing = []
+    for key in keys:
+        score = score_cache.get(key)
+        if score is None:
+            missing.append(key)
+        else:
+            found[key] = score
+    
+    if missing:
+        rows = db.query(ScoreCache.key, ScoreCache.score).filter(ScoreCache.key.in_(missing)).all()
+        for key, score in rows:
+            score_cache.put(key, score)
+            found[key] = score
+    return found
+
+def store_scores(db: Session, scores: Dict[str, float]):
+    """Write scores to the LRU and upsert them into score_cache (caller commits)"""
+    if not scores or not get_provider().cache_scores:
+        return
+    for key, score in scores.items():
+        score_cache.put(key, score)
+    stmt = insert(ScoreCache).values([{"key": key, "score": score} for key, score in scores.items()])
+    db.execute(stmt.on_conflict_do_update(index_elements=[ScoreCache.key], set_={"score": stmt.excluded.score}))
+
+def iter_cached_compute_job_matches(
+    db: Session,
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield match results as soon as they are known: cached scores first, then
+    LLM scores in completion order. New scores are written to the cache when
+    the iterator finishes or is closed early
+    """
+    resume_digest = text_digest(resume_text)
+    keys = {job["id"]: score_cache_key(resume_digest, job["description"]) for job in job_descriptions}
+    with timed("score_cache_read"):
+        cached = get_cached_scores(db, keys.values())
+    
+    for job_id, key in keys.items():
+        if key in cached:
+            yield {"job_id": job_id, "score": cached[key], "fallback": False}
+    
+    to_score = [job for job in job_descriptions if keys[job["id"]] not in cached]
+    scored = []
+    # Only time spent waiting on the LLM counts, not the consumer's work between results
+    waited = 0.0
+    results = iter_compute_job_matches(resume_text, to_score)
+    try:
+        while True:
+            start = time.perf_counter()
+            match = next(results, None)
+            waited += time.perf_counter() - start
+            if match is None:
+                break
+            scored.append(match)
+            yield match
+    finally:
+        results.close()
+        record_stage("llm_scoring", waited)
+        with timed("score_cache_write"):
+            store_scores(db, {keys[match["job_id"]]: match["score"] for match in scored if not match["fallback"]})
+
+def cached_batch_compute_job_matches(
+    db: Session,
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    batch_compute_job_matches that only sends pairs without a cached score to the LLM
+    on_progress(scored, total) is called from the calling thread as results arrive
+    Returns list of jobs with match scores, sorted by score in descending order
+    """
+    matches = []
+    if on_progress:
+        on_progress(0, len(job_descriptions))
+    for match in iter_cached_compute_job_matches(db, resume_text, job_descriptions):
+        matches.append(match)
+        if on_progress:
+            on_progress(len(matches), len(job_descriptions))
+    
+    matches.sort(key=lambda x: x["score"], reverse=True)
+    return matches
+
+def cached_compute_resume_matches(
+    db: Session,
+    job_description: str,
+    resumes: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Score one job against several {"id", "text"} resumes, only sending pairs
+    without a cached score to the LLM; returns {"resume_id", "score", "fallback"} dicts
+    """
+    keys = {resume["id"]: score_cache_key(text_digest(resume["text"]), job_description) for resume in resumes}
+    with timed("score_cache_read"):
+        cached = get_cached_scores(db, keys.values())
+    
+    matches = [{"resume_id": resume_id, "score": cached[key], "fallback": False} for resume_id, key in keys.items() if key in cached]
+    to_score = [resume for resume in resumes if keys[resume["id"]] not in cached]
+    if not to_score:
+        return matches
+    
+    with timed("llm_scoring"):
+        scored = batch_compute_resume_matches(job_description, to_score)
+    with timed("score_cache_write"):
+        store_scores(db, {keys[match["resume_id"]]: match["score"] for match in scored if not match["fallback"]})
+    return matches + scored
@@ -0,0 +1,228 @@
+import os
+import asyncio
+import weakref
+import zipfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, List, Dict, Any
+
+import docx
+import PyPDF2
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from backend.app.metrics import timed
+
+# Upload and extraction limits
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+# Worker processes used to extract text from uploaded documents
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# A document still being extracted after this long has its worker killed
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Limits for ZIP archives of resumes
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "500"))
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.doc', '.docx')
+
+class ExtractionError(Exception):
+    """Raised when a document can't be turned into text"""
+    
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail, status_code)
+        self.detail = detail
+        self.status_code = status_code
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Submissions are capped at the worker count so work never queues inside the pool:
+# the timeout then only covers running extractions, and a replaced pool has no
+# queued work to lose
+_slots = asyncio.Semaphore(EXTRACTION_WORKERS)
+# Pools whose workers were killed over a timeout; work lost with them is resubmitted
+_killed_pools = weakref.WeakSet()
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _pool
+
+def _replace_pool(pool: ProcessPoolExecutor, kill: bool = False):
+    """
+    Retire a broken or stuck pool; the next extraction starts a fresh one
+    With kill, its workers are terminated, since they can't be cancelled mid-task
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False)
+    if kill:
+        _killed_pools.add(pool)
+        for process in processes:
+            process.terminate()
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def is_supported(filename: Optional[str]) -> bool:
+    return bool(filename) and filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+def extract_text(path: str, filename: str) -> str:
+    """Extract text from a document on disk (runs in a worker process)"""
+    lower = filename.lower()
+    try:
+        # Handle PDF files
+        if lower.endswith('.pdf'):
+            pdf_reader = PyPDF2.PdfReader(path)
+            if len(pdf_reader.pages) > MAX_PDF_PAGES:
+                raise ExtractionError(f"PDF has more than {MAX_PDF_PAGES} pages", 413)
+            return "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
+        # Handle Word documents
+        if lower.endswith('.docx'):
+            document = docx.Document(path)
+            paragraphs = [paragraph.text for paragraph in document.paragraphs]
+            for table in document.tables:
+                for row in table.rows:
+                    paragraphs.append(" | ".join(cell.text for cell in row.cells))
+            return "\n".join(paragraphs)
+        # Handle text files (legacy .doc files are read as text, as before)
+        with open(path, "rb") as f:
+            return f.read().decode(errors="replace")
+    except ExtractionError:
+        raise
+    except Exception as e:
+        raise ExtractionError(f"Could not read {filename}: {str(e)}")
+
+async def spool_upload(file: UploadFile, max_bytes: Optional[int] = None) -> str:
+    """Copy an upload to a temp file in chunks, enforcing a size limit (MAX_UPLOAD_BYTES by default)"""
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    suffix = os.path.splitext(file.filename or "")[1]
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File is larger than {max_bytes} bytes")
+            await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+    tmp.close()
+    return tmp.name
+
+async def extract_file(path: str, filename: str) -> str:
+    """
+    Extract text from a file on disk in the process pool
+    A worker that dies (e.g. out of memory) or runs past EXTRACTION_TIMEOUT_SECONDS
+    takes the pool down with it, so the pool is replaced and the file rejected;
+    other files caught up in that are resubmitted to the fresh pool
+    """
+    loop = asyncio.get_running_loop()
+    crashes = 0
+    while True:
+        async with _slots:
+            pool = get_extraction_pool()
+            try:
+                with timed("extract"):
+                    return await asyncio.wait_for(
+                        loop.run_in_executor(pool, extract_text, path, filename), EXTRACTION_TIMEOUT_SECONDS
+                    )
+            except ExtractionError as e:
+                raise HTTPException(status_code=e.status_code, detail=e.detail)
+            except asyncio.TimeoutError:
+                _replace_pool(pool, kill=True)
+                raise HTTPException(status_code=422, detail=f"Timed out extracting text from {filename}")
+            except BrokenProcessPool:
+                _replace_pool(pool)
+                if pool in _killed_pools:
+                    # Killed over another file's timeout, which says nothing about this one
+                    continue
+                # The crash may have been another file's, so try once more on a fresh pool
+                crashes += 1
+                if crashes > 1:
+                    raise HTTPException(status_code=422, detail=f"Could not extract text from {filename}: the extraction worker crashed")
+
+async def extract_upload(file: UploadFile) -> str:
+    """Spool an uploaded resume to disk and extract its text off the event loop"""
+    if not is_supported(file.filename):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+    
+    path = await spool_upload(file)
+    try:
+        return await extract_file(path, file.filename)
+    finally:
+        os.unlink(path)
+
+def unpack_archive(archive_path: str, target_dir: str) -> List[Dict[str, Any]]:
+    """
+    Copy supported members of a ZIP archive into target_dir one at a time
+    Returns one entry per member with its extracted path or the reason it was skipped
+    """
+    members = []
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            infos = [info for info in archive.infolist() if not info.is_dir() and not info.filename.startswith("__MACOSX/")]
+            if len(infos) > MAX_BATCH_FILES:
+                raise HTTPException(status_code=413, detail=f"Archive has more than {MAX_BATCH_FILES} files")
+            
+            for index, info in enumerate(infos):
+                filename = os.path.basename(info.filename)
+                if not is_supported(filename):
+                    members.append({"filename": filename, "path": None, "error": "Unsupported file format"})
+                    continue
+                if info.file_size > MAX_UPLOAD_BYTES:
+                    members.append({"filename": filename, "path": None, "error": f"File is larger than {MAX_UPLOAD_BYTES} bytes"})
+                    continue
+                
+                # Members are written under generated names so archive paths can't escape target_dir
+                path = os.path.join(target_dir, f"{index}{os.path.splitext(filename)[1]}")
+                size = 0
+                with archive.open(info) as src, open(path, "wb") as dst:
+                    while True:
+                        chunk = src.read(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        # Don't trust the declared size in the archive header
+                        size += len(chunk)
+                        if size > MAX_UPLOAD_BYTES:
+                            break
+                        dst.write(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    os.unlink(path)
+                    members.append({"filename": filename, "path": None, "error": f"File is larger than {MAX_UPLOAD_BYTES} bytes"})
+                else:
+                    members.append({"filename": filename, "path": path, "error": None})
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="File is not a valid ZIP archive")
+    return members
+
+async def extract_archive(archive_path: str) -> List[Dict[str, Any]]:
+    """
+    Extract text from every supported member of a ZIP archive in parallel across the process pool
+    Returns one {filename, content, error} entry per member, in archive order
+    """
+    with tempfile.TemporaryDirectory() as target_dir:
+        members = await run_in_threadpool(unpack_archive, archive_path, target_dir)
+        
+        async def extract_member(member: Dict[str, Any]) -> Dict[str, Any]:
+            if member["error"]:
+                return {"filename": member["filename"], "content": None, "error": member["error"]}
+            try:
+                content = await extract_file(member["path"], member["filename"])
+            except HTTPException as e:
+                return {"filename": member["filename"], "content": None, "error": e.detail}
+            return {"filename": member["filename"], "content": content, "error": None}
+        
+        return await asyncio.gather(*(extract_member(member) for member in members))
\ No newline at end of file
@@ -0,0 +1,131 @@
+import os
+import io
+import csv
+import json
+from typing import Dict, Any, Iterator, List, Tuple, IO
+
+from pydantic import ValidationError
+from sqlalchemy import or_, literal_column, null
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from backend.app.database import SessionLocal
+from backend.app.models import Job
+from backend.app.schemas.job import JobCreate
+
+# Rows validated and written per multi-row INSERT
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+# Per-row errors returned in the response; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+def iter_ndjson_rows(f: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, parsed object or error message) for each non-blank line"""
+    for row_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {str(e)}"
+
+def iter_csv_rows(f: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, row dict) for each CSV data row, using the header for field names"""
+    for row_number, row in enumerate(csv.DictReader(f), 1):
+        # Empty cells mean "not given" so optional fields get their defaults
+        yield row_number, {key: value for key, value in row.items() if key and value not in (None, "")}
+
+def _write_chunk(db: Session, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Insert a chunk of validated jobs, upserting those with an external id; returns (inserted, updated)"""
+    by_external_id = {}
+    plain = []
+    for row in rows:
+        if row.get("external_id"):
+            # Later rows win when a load repeats an external id
+            by_external_id[row["external_id"]] = row
+        else:
+            plain.append(row)
+    
+    inserted = updated = 0
+    if plain:
+        db.execute(insert(Job).values(plain))
+        inserted += len(plain)
+    if by_external_id:
+        stmt = insert(Job).values(list(by_external_id.values()))
+        fields = ["title", "company", "location", "description"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Job.external_id],
+            # The old profile describes the old posting, so it is cleared for re-extraction
+            set_={**{field: stmt.excluded[field] for field in fields}, "profile": null(), "updated_at": func.now()},
+            # Leave unchanged postings alone so their matches stay current
+            where=or_(*[getattr(Job, field).is_distinct_from(stmt.excluded[field]) for field in fields])
+        ).returning(literal_column("xmax = 0"))
+        for (was_inserted,) in db.execute(stmt):
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
+    db.commit()
+    return inserted, updated
+
+def ingest_jobs(db: Session, f: IO[str], fmt: str) -> Dict[str, Any]:
+    """
+    Validate and write jobs from an NDJSON or CSV text stream in chunks
+    Bad rows are reported individually and never abort the rest of the load
+    """
+    result = {"received": 0, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "errors": []}
+    
+    def fail(row_number: int, error: str):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"row": row_number, "error": error})
+    
+    def flush(chunk: List[Tuple[int, Dict[str, Any]]]):
+        try:
+            inserted, updated = _write_chunk(db, [row for _, row in chunk])
+        except SQLAlchemyError as e:
+            db.rollback()
+            if len(chunk) > 1:
+                # Write rows one at a time so only the ones the database rejects fail
+                for item in chunk:
+                    flush([item])
+                return
+            row_number, _ = chunk[0]
+            fail(row_number, f"Database error: {str(e.orig) if getattr(e, 'orig', None) else str(e)}")
+            return
+        result["inserted"] += inserted
+        result["updated"] += updated
+        result["unchanged"] += len(chunk) - inserted - updated
+    
+    rows = iter_csv_rows(f) if fmt == "csv" else iter_ndjson_rows(f)
+    chunk = []
+    for row_number, row in rows:
+        result["received"] += 1
+        if isinstance(row, str):
+            fail(row_number, row)
+            continue
+        if not isinstance(row, dict):
+            fail(row_number, "Expected a JSON object")
+            continue
+        try:
+            chunk.append((row_number, JobCreate(**row).dict()))
+        except ValidationError as e:
+            fail(row_number, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return result
+
+def ingest_jobs_file(f: IO[bytes], fmt: str) -> Dict[str, Any]:
+    """Run ingest_jobs over a spooled binary upload with its own session"""
+    db = SessionLocal()
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return ingest_jobs(db, text, fmt)
+    finally:
+        text.detach()
+        db.close()
@@ -1,25 +1,139 @@
 import os
 import json
-import google.generativeai as genai
-from typing import List, Dict, Any
+import time
+import queue
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
 from fastapi import HTTPException
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+from backend.app.providers import get_provider, LocalProvider
+from backend.app.metrics import LLM_CALL_SECONDS, LLM_ERRORS, LLM_RETRIES, SCORES
+from backend.app.resilience import (
+    rate_limiter, circuit_breaker, is_retryable, backoff_delay, CircuitOpenError, LLM_MAX_RETRIES,
+)
+from backend.app.prompts import (
+    estimate_tokens, compact_text, compact_match_inputs, token_usage,
+    PROMPT_TOKEN_BUDGET, JOB_BUDGET_SHARE, COMPACTION_VERSION,
+)
 
-# Set up Gemini API with your API key (from environment variable)
-API_KEY = os.getenv("GEMINI_API_KEY")
+logger = logging.getLogger(__name__)
 
-# Check if API key is available
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set. Please set this variable to use the Gemini API.")
+# Scoring engine configuration
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
 
-# Configure the API
-genai.configure(api_key=API_KEY)
+# Batched scoring packs several jobs into one prompt alongside a single copy of the resume
+LLM_BATCH_SCORING = os.getenv("LLM_BATCH_SCORING", "false").lower() in ("1", "true", "yes")
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "8000"))
+LLM_BATCH_MAX_JOBS = int(os.getenv("LLM_BATCH_MAX_JOBS", "25"))
+LLM_BATCH_RETRIES = int(os.getenv("LLM_BATCH_RETRIES", "2"))
 
-# Initialize Gemini model
-model = genai.GenerativeModel('gemini-2.0-flash')
+# What jobs get when the LLM can't score them: "local" scores them with the
+# offline lexical scorer; "none" uses the fallback score and fails the whole
+# match fast while the circuit breaker is open
+LLM_FAILURE_FALLBACK = os.getenv("LLM_FAILURE_FALLBACK", "local").lower()
+
+# The async Gemini client is cached globally by the SDK and bound to the event
+# loop it was first used on, so all async scoring runs on one long-lived loop.
+_scoring_loop: Optional[asyncio.AbstractEventLoop] = None
+_scoring_loop_lock = threading.Lock()
+
+def get_scoring_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop used for async Gemini calls, starting it if needed"""
+    global _scoring_loop
+    with _scoring_loop_lock:
+        if _scoring_loop is None:
+            _scoring_loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_scoring_loop.run_forever, name="llm-scoring-loop", daemon=True)
+            thread.start()
+    return _scoring_loop
+
+def run_scoring(coro):
+    """Run a coroutine on the shared scoring loop and block until it finishes"""
+    return asyncio.run_coroutine_threadsafe(coro, get_scoring_loop()).result()
+
+def parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Parse the outermost JSON object in a model reply, ignoring code fences or prose around it"""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        value = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+def _check_circuit(kind: str):
+    if not circuit_breaker.allow():
+        LLM_ERRORS.labels(kind, "circuit_open").inc()
+        raise CircuitOpenError("LLM provider is unavailable after repeated failures")
+
+def _record_failure(kind: str, error: Exception, attempt: int) -> bool:
+    """Count a failed call and return whether it should be retried"""
+    circuit_breaker.record_failure()
+    is_timeout = isinstance(error, asyncio.TimeoutError)
+    LLM_ERRORS.labels(kind, "timeout" if is_timeout else "error").inc()
+    if attempt >= LLM_MAX_RETRIES or not is_retryable(error):
+        return False
+    LLM_RETRIES.labels(kind).inc()
+    return True
+
+def generate_text(kind: str, prompt: str) -> str:
+    """
+    Call the provider with the shared rate limiter, circuit breaker and
+    jittered exponential-backoff retries of transient errors
+    """
+    provider = get_provider()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        _check_circuit(kind)
+        rate_limiter.acquire(estimate_tokens(prompt))
+        try:
+            with LLM_CALL_SECONDS.labels(kind).time():
+                response_text = provider.generate(prompt)
+        except Exception as e:
+            if not _record_failure(kind, e, attempt):
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        circuit_breaker.record_success()
+        token_usage.record(kind, prompt, response_text)
+        return response_text
+
+async def agenerate_text(kind: str, prompt: str, timeout: Optional[float] = None) -> str:
+    """Async variant of generate_text, applying the timeout to each attempt"""
+    provider = get_provider()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        _check_circuit(kind)
+        try:
+            # Wait for the limiter inside the try so a cancelled wait still gives back a trial slot
+            await rate_limiter.acquire_async(estimate_tokens(prompt))
+            with LLM_CALL_SECONDS.labels(kind).time():
+                response_text = await asyncio.wait_for(provider.agenerate(prompt), timeout or LLM_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            circuit_breaker.release()
+            raise
+        except Exception as e:
+            if not _record_failure(kind, e, attempt):
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        circuit_breaker.record_success()
+        token_usage.record(kind, prompt, response_text)
+        return response_text
+
+def fallback_matches(resume_text: str, jobs: List[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+    """Results for jobs the LLM failed to score, so one bad call doesn't fail the whole match"""
+    if not isinstance(error, CircuitOpenError):
+        logger.warning("Falling back for %d job(s) after LLM failure: %s", len(jobs), error)
+    if LLM_FAILURE_FALLBACK == "local":
+        local = LocalProvider()
+        return [{"job_id": job["id"], "score": local.score(resume_text, job["description"]), "fallback": True} for job in jobs]
+    if isinstance(error, CircuitOpenError):
+        raise HTTPException(status_code=503, detail="Scoring is temporarily unavailable, please try again later")
+    return [{"job_id": job["id"], "score": FALLBACK_SCORE, "fallback": True} for job in jobs]
 
 def extract_resume_info(resume_text: str) -> Dict[str, Any]:
     """Extract structured information from resume text using Gemini"""
@@ -36,27 +150,81 @@ def extract_resume_info(resume_text: str) -> Dict[str, Any]:
         Return ONLY valid JSON.
         """
         
-        response = model.generate_content(prompt)
-        try:
-            # Extract the JSON part from the response
-            return json.loads(response.text)
-        except:
+        provider = get_provider()
+        if not provider.generates_text:
+            return provider.extract_profile(resume_text)
+        response_text = generate_text("resume_profile", prompt)
+        # Extract the JSON part from the response
+        profile = parse_json_object(response_text)
+        if profile is None:
             # Fallback if JSON parsing fails
             return {
                 "skills": [],
                 "experience": [],
                 "education": []
             }
+        return profile
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to Gemini API: {str(e)}")
 
-def compute_job_match(resume_text: str, job_description: str) -> float:
-    """
-    Use Gemini to compute match score between resume and job description
-    Returns a score between 0 and 1
-    """
+def extract_job_info(job_description: str) -> Dict[str, Any]:
+    """Extract the requirements of a job description using Gemini"""
     try:
         prompt = f"""
+        Extract the requirements from this job description in JSON format. Include:
+        - skills (list of required and preferred technical and soft skills)
+        - experience (list of required experience, e.g. years in a role or domain)
+        - education (list of required degrees or certifications)
+        - responsibilities (list of the main responsibilities, a few words each)
+
+        Job Description:
+        {job_description}
+
+        Return ONLY valid JSON.
+        """
+        
+        provider = get_provider()
+        if not provider.generates_text:
+            return provider.extract_profile(job_description)
+        response_text = generate_text("job_profile", prompt)
+        profile = parse_json_object(response_text)
+        if profile is None:
+            return {
+                "skills": [],
+                "experience": [],
+                "education": [],
+                "responsibilities": []
+            }
+        return profile
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error connecting to Gemini API: {str(e)}")
+
+def _format_profile_item(item: Any) -> str:
+    if isinstance(item, dict):
+        return ", ".join(str(value) for value in item.values() if value not in (None, "", []))
+    return str(item)
+
+def serialize_profile(profile: Optional[Dict[str, Any]]) -> str:
+    """
+    Compact text form of an extracted profile, one line per section,
+    or "" when the profile is missing or empty
+    """
+    if not isinstance(profile, dict):
+        return ""
+    lines = []
+    for section, value in profile.items():
+        items = value if isinstance(value, list) else [value]
+        parts = [_format_profile_item(item) for item in items if item]
+        parts = [part for part in parts if part]
+        if parts:
+            lines.append(f"{section.replace('_', ' ').capitalize()}: {'; '.join(parts)}")
+    return "\n".join(lines)
+
+def scoring_text(profile: Optional[Dict[str, Any]], raw_text: str) -> str:
+    """Text sent to the scoring prompts: the compact profile when there is one, else the raw text"""
+    return serialize_profile(profile) or raw_text
+
+MATCH_PROMPT = """
         Analyze the compatibility between the resume and job description below.
         Evaluate how well the candidate's skills, experience, and qualifications match the job requirements.
         
@@ -68,33 +236,298 @@ def compute_job_match(resume_text: str, job_description: str) -> float:
         
         Return ONLY a score between 0 and 1 (where 1 is a perfect match), with no explanation.
         """
+
+BATCH_MATCH_PROMPT = """
+        Analyze the compatibility between the resume and each job description below.
+        Evaluate how well the candidate's skills, experience, and qualifications match each job's requirements.
+        
+        Resume:
+        {resume_text}
+        
+        Jobs:
+        {jobs}
         
-        response = model.generate_content(prompt)
+        Return ONLY a JSON array with exactly one object per job, in the form
+        [{{"job_id": <job id>, "score": <score between 0 and 1>}}], with no explanation.
+        """
+
+BATCH_JOB_TEMPLATE = """
+        Job ID: {job_id}
+        {job_description}
+        ---"""
+
+# Changes whenever a scoring prompt or the prompt compaction is edited, which invalidates cached scores
+PROMPT_VERSION = hashlib.sha256(
+    (MATCH_PROMPT + BATCH_MATCH_PROMPT + BATCH_JOB_TEMPLATE + COMPACTION_VERSION + str(PROMPT_TOKEN_BUDGET)).encode()
+).hexdigest()[:16]
+
+def plan_job_batches(
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+    token_budget: Optional[int] = None,
+    max_jobs: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily pack jobs into batches whose prompts fit the token budget
+    A job that does not fit on its own still gets a batch of one
+    """
+    token_budget = token_budget or LLM_BATCH_TOKEN_BUDGET
+    max_jobs = max_jobs or LLM_BATCH_MAX_JOBS
+    available = token_budget - estimate_tokens(BATCH_MATCH_PROMPT.format(resume_text=resume_text, jobs=""))
+    
+    batches = []
+    current, current_tokens = [], 0
+    for job in job_descriptions:
+        job_tokens = estimate_tokens(BATCH_JOB_TEMPLATE.format(job_id=job["id"], job_description=job["description"]))
+        if current and (current_tokens + job_tokens > available or len(current) >= max_jobs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(job)
+        current_tokens += job_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_scores(text: str, job_ids) -> Dict[Any, float]:
+    """
+    Parse a JSON array of {job_id, score} objects from a model reply
+    Entries for unknown jobs or with invalid scores are dropped
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    
+    # Job ids may come back as strings, so match on their string form
+    expected = {str(job_id): job_id for job_id in job_ids}
+    scores = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or str(item.get("job_id")) not in expected:
+            continue
         try:
-            # Try to parse the score as a float
-            score = float(response.text.strip())
-            # Ensure the score is between 0 and 1
-            return max(0, min(score, 1))
-        except:
-            # Fallback if parsing fails
-            return 0.5
+            score = float(item.get("score"))
+        except (TypeError, ValueError):
+            continue
+        scores[expected[str(item["job_id"])]] = max(0, min(score, 1))
+    return scores
+
+# Score used when the model reply cannot be parsed; fallback scores are never cached
+FALLBACK_SCORE = 0.5
+
+def try_parse_score(text: str) -> Optional[float]:
+    """Parse a model reply into a score between 0 and 1, or None if it isn't a number"""
+    try:
+        # Try to parse the score as a float
+        score = float(text.strip())
+        # Ensure the score is between 0 and 1
+        return max(0, min(score, 1))
+    except:
+        return None
+
+def parse_score(text: str) -> float:
+    """Parse a model reply into a score between 0 and 1, falling back to 0.5"""
+    score = try_parse_score(text)
+    SCORES.labels("fallback" if score is None else "parsed").inc()
+    return FALLBACK_SCORE if score is None else score
+
+def compute_job_match(resume_text: str, job_description: str) -> float:
+    """
+    Use Gemini to compute match score between resume and job description
+    Returns a score between 0 and 1
+    """
+    try:
+        provider = get_provider()
+        if not provider.generates_text:
+            return provider.score(resume_text, job_description)
+        resume_text, job_description = compact_match_inputs(resume_text, job_description)
+        prompt = MATCH_PROMPT.format(resume_text=resume_text, job_description=job_description)
+        return parse_score(generate_text("match", prompt))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to Gemini API: {str(e)}")
 
-def batch_compute_job_matches(resume_text: str, job_descriptions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+async def compute_job_match_async(resume_text: str, job_description: str, timeout: Optional[float] = None) -> Optional[float]:
     """
-    Compute match scores for multiple jobs at once
-    Returns list of jobs with match scores
+    Async variant of compute_job_match using the provider's async client
+    Returns None instead of the fallback score when the reply can't be parsed
     """
+    provider = get_provider()
+    if not provider.generates_text:
+        return provider.score(resume_text, job_description)
+    resume_text, job_description = compact_match_inputs(resume_text, job_description)
+    prompt = MATCH_PROMPT.format(resume_text=resume_text, job_description=job_description)
+    return try_parse_score(await agenerate_text("match", prompt, timeout))
+
+async def _score_job(semaphore: asyncio.Semaphore, resume_text: str, job: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+    async with semaphore:
+        try:
+            score = await compute_job_match_async(resume_text, job["description"], timeout)
+        except Exception as e:
+            return fallback_matches(resume_text, [job], e)
+    if score is None:
+        return [{"job_id": job["id"], "score": FALLBACK_SCORE, "fallback": True}]
+    return [{"job_id": job["id"], "score": score, "fallback": False}]
+
+async def _score_job_batch(semaphore: asyncio.Semaphore, resume_text: str, jobs: List[Dict[str, Any]], timeout: float) -> List[Dict[str, Any]]:
+    """Score several jobs with one prompt, re-asking only for jobs missing from the reply"""
+    pending = {job["id"]: job for job in jobs}
     matches = []
     
-    for job in job_descriptions:
-        score = compute_job_match(resume_text, job["description"])
-        matches.append({
-            "job_id": job["id"],
-            "score": score
-        })
+    for _ in range(LLM_BATCH_RETRIES + 1):
+        jobs_text = "".join(
+            BATCH_JOB_TEMPLATE.format(job_id=job_id, job_description=job["description"])
+            for job_id, job in pending.items()
+        )
+        prompt = BATCH_MATCH_PROMPT.format(resume_text=resume_text, jobs=jobs_text)
+        async with semaphore:
+            try:
+                response_text = await agenerate_text("batch_match", prompt, timeout)
+            except Exception as e:
+                matches.extend(fallback_matches(resume_text, list(pending.values()), e))
+                return matches
+        
+        for job_id, score in parse_batch_scores(response_text, pending).items():
+            matches.append({"job_id": job_id, "score": score, "fallback": False})
+            del pending[job_id]
+        if not pending:
+            break
+    
+    # Jobs the model kept leaving out get the same fallback as an unparseable single score
+    matches.extend({"job_id": job_id, "score": FALLBACK_SCORE, "fallback": True} for job_id in pending)
+    return matches
+
+async def iter_job_matches(
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    batch_scoring: Optional[bool] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Score jobs concurrently, at most `concurrency` Gemini calls in flight,
+    yielding each result as soon as it completes
+    With batch scoring enabled, each call scores a token-budgeted batch of jobs
+    """
+    semaphore = asyncio.Semaphore(concurrency or LLM_CONCURRENCY)
+    timeout = timeout or LLM_TIMEOUT_SECONDS
+    batch_scoring = batch_scoring if batch_scoring is not None else LLM_BATCH_SCORING
+    if batch_scoring and get_provider().generates_text:
+        # Compact each job once and the shared resume once, keeping the resume sections relevant to these jobs
+        job_budget = int(PROMPT_TOKEN_BUDGET * JOB_BUDGET_SHARE)
+        jobs = [{**job, "description": compact_text(job["description"], job_budget)} for job in job_descriptions]
+        focus = " ".join(job["description"] for job in jobs)
+        resume_text = compact_text(resume_text, PROMPT_TOKEN_BUDGET - job_budget, focus_text=focus)
+        calls = [_score_job_batch(semaphore, resume_text, batch, timeout) for batch in plan_job_batches(resume_text, jobs)]
+    else:
+        calls = [_score_job(semaphore, resume_text, job, timeout) for job in job_descriptions]
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for match in await next_done:
+                SCORES.labels("fallback" if match["fallback"] else "parsed").inc()
+                yield match
+    finally:
+        # Stop outstanding calls if the consumer bails out or a call failed
+        for task in tasks:
+            task.cancel()
+
+async def abatch_compute_job_matches(
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    batch_scoring: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """Async variant of batch_compute_job_matches"""
+    matches = [match async for match in iter_job_matches(resume_text, job_descriptions, concurrency, timeout, batch_scoring)]
     
     # Sort by score in descending order
     matches.sort(key=lambda x: x["score"], reverse=True)
-    return matches
\ No newline at end of file
+    return matches
+
+async def abatch_compute_resume_matches(
+    job_description: str,
+    resumes: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Score one job against several resumes concurrently, at most `concurrency` calls in flight
+    resumes are {"id", "text"} dicts; returns {"resume_id", "score", "fallback"} dicts
+    """
+    semaphore = asyncio.Semaphore(concurrency or LLM_CONCURRENCY)
+    timeout = timeout or LLM_TIMEOUT_SECONDS
+    tasks = [
+        asyncio.ensure_future(_score_job(semaphore, resume["text"], {"id": resume["id"], "description": job_description}, timeout))
+        for resume in resumes
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    matches = []
+    for resume, (match,) in zip(resumes, results):
+        SCORES.labels("fallback" if match["fallback"] else "parsed").inc()
+        matches.append({"resume_id": resume["id"], "score": match["score"], "fallback": match["fallback"]})
+    return matches
+
+def batch_compute_resume_matches(
+    job_description: str,
+    resumes: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Score one job against several resumes; the reverse of batch_compute_job_matches"""
+    return run_scoring(abatch_compute_resume_matches(job_description, resumes, concurrency, timeout))
+
+def batch_compute_job_matches(
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    batch_scoring: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compute match scores for multiple jobs at once
+    Returns list of jobs with match scores
+    """
+    return run_scoring(abatch_compute_job_matches(resume_text, job_descriptions, concurrency, timeout, batch_scoring))
+
+def iter_compute_job_matches(
+    resume_text: str,
+    job_descriptions: List[Dict[str, Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    batch_scoring: Optional[bool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Blocking iterator over match results in completion order, for callers
+    running in worker threads rather than on an event loop
+    """
+    results = queue.Queue()
+    done = object()
+    
+    async def pump():
+        try:
+            async for match in iter_job_matches(resume_text, job_descriptions, concurrency, timeout, batch_scoring):
+                results.put(match)
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(done)
+    
+    future = asyncio.run_coroutine_threadsafe(pump(), get_scoring_loop())
+    try:
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
\ No newline at end of file
@@ -0,0 +1,358 @@
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator
+
+from sqlalchemy import or_, DateTime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from backend.app.models import Resume, Job, Match
+from backend.app.cache import cached_batch_compute_job_matches, iter_cached_compute_job_matches, cached_compute_resume_matches
+from backend.app.llm import extract_resume_info, extract_job_info, scoring_text, serialize_profile
+from backend.app.providers import get_provider
+from backend.app.retrieval import shortlist_jobs, shortlist_resumes, job_catalog_version, MATCH_MODE, CANDIDATE_TOP_K
+from backend.app.singleflight import SingleFlight, advisory_lock
+from backend.app.metrics import timed
+
+# Rows per INSERT ... ON CONFLICT statement, well below Postgres' bind parameter limit
+MATCH_UPSERT_CHUNK = 5000
+
+# New scores are saved once this many are waiting or this long after the last save
+MATCH_SAVE_BATCH = 25
+MATCH_SAVE_INTERVAL_SECONDS = 1.0
+
+# First key of the advisory locks serialising matches of one resume across processes
+MATCH_LOCK_NAMESPACE = 4201
+
+_match_flights = SingleFlight()
+
+SAMPLE_JOBS = [
+    {
+        "title": "Software Engineer",
+        "description": "Looking for a software engineer with experience in Python, FastAPI, and PostgreSQL. Must have strong problem-solving skills and experience with RESTful APIs.",
+        "company": "Tech Corp"
+    },
+    {
+        "title": "Data Scientist",
+        "description": "Seeking a data scientist with experience in machine learning, Python, and data analysis. Must have experience with pandas, numpy, and scikit-learn.",
+        "company": "Data Insights"
+    },
+    {
+        "title": "DevOps Engineer",
+        "description": "Looking for a DevOps engineer with experience in Docker, Kubernetes, and CI/CD pipelines. Must have experience with cloud platforms like AWS or GCP.",
+        "company": "Cloud Solutions"
+    }
+]
+
+def ensure_sample_jobs(db: Session):
+    """Check if we have any jobs, if not create some sample jobs"""
+    if db.query(Job).count() == 0:
+        for job_data in SAMPLE_JOBS:
+            db.add(Job(**job_data))
+        db.commit()
+
+def current_match_scores(db: Session, resume_id: int, job_ids: Iterable[int]) -> Dict[int, float]:
+    """Scores of existing matches that are still current, i.e. the job hasn't changed since scoring"""
+    rows = db.query(Match.job_id, Match.score).join(Job, Job.id == Match.job_id).filter(
+        Match.resume_id == resume_id,
+        Match.job_id.in_(list(job_ids)),
+        or_(Job.updated_at.is_(None), Match.created_at.is_(None), Job.updated_at <= Match.created_at)
+    ).all()
+    return {job_id: score for job_id, score in rows}
+
+def score_jobs(
+    db: Session,
+    resume: Resume,
+    job_ids: List[int],
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Score a resume against specific jobs with the LLM"""
+    if not job_ids:
+        return []
+    # Compute matches using LLM, reusing cached scores for unchanged resume/job pairs
+    return cached_batch_compute_job_matches(db, *_scoring_inputs(db, resume, job_ids), on_progress)
+
+def iter_score_jobs(db: Session, resume: Resume, job_ids: List[int]) -> Iterator[Dict[str, Any]]:
+    """Like score_jobs, but yields each result as soon as it is known"""
+    if not job_ids:
+        return
+    yield from iter_cached_compute_job_matches(db, *_scoring_inputs(db, resume, job_ids))
+
+def _scoring_inputs(db: Session, resume: Resume, job_ids: List[int]):
+    jobs = db.query(Job.id, Job.description, Job.profile).filter(Job.id.in_(job_ids)).all()
+    # Prompts carry the compact extracted profiles where they exist
+    job_data = [{"id": job.id, "description": scoring_text(job.profile, job.description)} for job in jobs]
+    return scoring_text(resume.profile, resume.content), job_data
+
+def database_now(db: Session) -> datetime:
+    """The database clock, which also stamps jobs' updated_at"""
+    return db.query(func.now(type_=DateTime)).scalar()
+
+def save_matches(db: Session, resume_id: int, matches: List[Dict[str, Any]], scored_at: datetime):
+    """
+    Store matches in database with multi-row upserts on (resume_id, job_id)
+    Fallback scores are not stored, so those jobs are scored again on the next match
+    """
+    upsert_matches(db, [
+        {"resume_id": resume_id, "job_id": match["job_id"], "score": match["score"], "created_at": scored_at}
+        for match in matches if not match.get("fallback")
+    ])
+
+def upsert_matches(db: Session, rows: List[Dict[str, Any]]):
+    """
+    Insert or update {resume_id, job_id, score, created_at} rows, where
+    created_at is the database time taken before the job texts were read
+    for scoring, so a job edited mid-run leaves its match stale
+    """
+    with timed("match_write"):
+        for start in range(0, len(rows), MATCH_UPSERT_CHUNK):
+            stmt = insert(Match).values(rows[start:start + MATCH_UPSERT_CHUNK])
+            db.execute(stmt.on_conflict_do_update(
+                constraint="uq_matches_resume_job",
+                set_={"score": stmt.excluded.score, "created_at": stmt.excluded.created_at},
+                # A run that started earlier never overwrites a newer score
+                where=or_(Match.created_at.is_(None), Match.created_at <= stmt.excluded.created_at)
+            ))
+        
+        db.commit()
+
+def match_resume(
+    db: Session,
+    resume: Resume,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Score a resume against the job catalog, coalescing duplicate requests
+    Concurrent calls for the same resume and catalog version in this process
+    share one run and its result. Across processes an advisory lock makes
+    runs for a resume take turns, and a later run finds the matches the
+    earlier one stored still current, so it sends nothing to the LLM.
+    """
+    key = (resume.id, job_catalog_version(db))
+    
+    def run(report: Callable[[int, int], None]) -> List[Dict[str, Any]]:
+        with advisory_lock(db, MATCH_LOCK_NAMESPACE, resume.id):
+            return _match_resume(db, resume, report)
+    
+    return _match_flights.do(key, run, on_progress)
+
+def stream_match_resume(
+    db: Session,
+    resume: Resume,
+    on_shortlist: Optional[Callable[[List[int]], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """iter_match_resume under the resume's advisory lock, for streaming responses"""
+    with advisory_lock(db, MATCH_LOCK_NAMESPACE, resume.id):
+        yield from iter_match_resume(db, resume, on_shortlist=on_shortlist)
+
+def _match_resume(
+    db: Session,
+    resume: Resume,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Score a resume against the job catalog and persist the results
+    Returns list of jobs with match scores, sorted by score in descending order
+    """
+    matches = list(iter_match_resume(db, resume, on_progress))
+    matches.sort(key=lambda x: x["score"], reverse=True)
+    return matches
+
+def iter_match_resume(
+    db: Session,
+    resume: Resume,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    on_shortlist: Optional[Callable[[List[int]], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a resume's match against each shortlisted job as soon as its score is known
+    Current stored matches come first, then cached and LLM scores; only
+    shortlisted jobs without a current match are sent to the LLM, and new
+    scores are saved in small batches as they arrive. on_shortlist receives
+    the shortlisted job ids before the first result
+    """
+    ensure_sample_jobs(db)
+    # Taken before any job is read, so jobs changed during the run are rescored next time
+    scored_at = database_now(db)
+    
+    # Shortlist jobs locally so only the best candidates go to the LLM
+    with timed("retrieval"):
+        shortlist = shortlist_jobs(db, resume.content)
+    total = len(shortlist)
+    if on_shortlist:
+        on_shortlist([job_id for job_id, _ in shortlist])
+    
+    if MATCH_MODE == "local":
+        # Use the retrieval scores directly, with no LLM calls
+        matches = [{"job_id": job_id, "score": score, "fallback": False} for job_id, score in shortlist]
+        save_matches(db, resume.id, matches, scored_at)
+        if on_progress:
+            on_progress(total, total)
+        yield from matches
+        return
+    
+    with timed("match_read"):
+        current = current_match_scores(db, resume.id, [job_id for job_id, _ in shortlist])
+    for job_id, score in current.items():
+        yield {"job_id": job_id, "score": score, "fallback": False}
+    done = len(current)
+    if on_progress:
+        on_progress(done, total)
+    
+    stale_ids = [job_id for job_id, _ in shortlist if job_id not in current]
+    unsaved = []
+    last_save = time.monotonic()
+    scored = iter_score_jobs(db, resume, stale_ids)
+    try:
+        for match in scored:
+            unsaved.append(match)
+            if len(unsaved) >= MATCH_SAVE_BATCH or time.monotonic() - last_save >= MATCH_SAVE_INTERVAL_SECONDS:
+                save_matches(db, resume.id, unsaved, scored_at)
+                unsaved, last_save = [], time.monotonic()
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+            yield match
+    finally:
+        # Closing the scorer writes new scores to the score cache; the final save
+        # commits them along with what was scored, even if the consumer stopped early
+        scored.close()
+        save_matches(db, resume.id, unsaved, scored_at)
+
+def fan_out_job(db: Session, job_id: int):
+    """
+    Score a new or updated job against the matched resumes it is likely to suit
+    Only resumes the resume index ranks in the job's top CANDIDATE_TOP_K are
+    scored, concurrently, so a posting that suits nobody costs no LLM calls;
+    the rest pick the job up on their next /match/ if it enters their shortlist
+    """
+    if MATCH_MODE == "local":
+        # Local scores are cheap enough to compute on the next /match/ call
+        return
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        return
+    shortlist_ids = [resume_id for resume_id, score in shortlist_resumes(job.description) if score > 0]
+    if not shortlist_ids:
+        return
+    matched = {
+        row.resume_id for row in
+        db.query(Match.resume_id).filter(Match.resume_id.in_(shortlist_ids)).distinct().all()
+    }
+    stored = current_candidate_scores(db, job, list(matched), 0)
+    score_candidates(db, job, [resume_id for resume_id in shortlist_ids if resume_id in matched and resume_id not in stored])
+
+def current_candidate_scores(db: Session, job: Job, resume_ids: List[int], top_k: int) -> Dict[int, float]:
+    """
+    Stored scores of the job against the given resumes, plus its top_k best
+    stored scores overall, keeping only those computed since the job last changed
+    """
+    query = db.query(Match.resume_id, Match.score).filter(Match.job_id == job.id)
+    if job.updated_at is not None:
+        query = query.filter(or_(Match.created_at.is_(None), Match.created_at >= job.updated_at))
+    rows = query.filter(Match.resume_id.in_(resume_ids)).all()
+    rows += query.order_by(Match.score.desc()).limit(top_k).all()
+    return {resume_id: score for resume_id, score in rows}
+
+def score_candidates(db: Session, job: Job, resume_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Score a job against the given resumes concurrently and store the results as their matches
+    Returns {"resume_id", "score", "fallback"} dicts
+    """
+    if not resume_ids:
+        return []
+    scored_at = database_now(db)
+    # Read the job again after taking the time, in case it changed since it was loaded
+    job_text = db.query(Job.description, Job.profile).filter(Job.id == job.id).one()
+    resumes = db.query(Resume.id, Resume.content, Resume.profile).filter(Resume.id.in_(resume_ids)).all()
+    scored = cached_compute_resume_matches(
+        db,
+        scoring_text(job_text.profile, job_text.description),
+        [{"id": resume.id, "text": scoring_text(resume.profile, resume.content)} for resume in resumes]
+    )
+    # Also commits the score cache writes
+    upsert_matches(db, [
+        {"resume_id": match["resume_id"], "job_id": job.id, "score": match["score"], "created_at": scored_at}
+        for match in scored if not match["fallback"]
+    ])
+    return scored
+
+def rank_candidates(db: Session, job: Job, top_k: int, rerank: bool = True) -> List[Dict[str, Any]]:
+    """
+    Best top_k resumes for a job, as {resume_id, score, source} dicts
+    Resumes are shortlisted from the resume index built in the background; stored match
+    scores are reused and only shortlisted resumes without one go to the LLM.
+    Without reranking the retrieval scores rank the shortlist.
+    """
+    with timed("retrieval"):
+        shortlist = shortlist_resumes(job.description, max(top_k, CANDIDATE_TOP_K))
+    if not rerank or MATCH_MODE == "local":
+        return [{"resume_id": resume_id, "score": score, "source": "retrieval"} for resume_id, score in shortlist[:top_k]]
+    
+    shortlist_ids = [resume_id for resume_id, _ in shortlist]
+    with timed("match_read"):
+        stored = current_candidate_scores(db, job, shortlist_ids, top_k)
+    candidates = {
+        resume_id: {"resume_id": resume_id, "score": score, "source": "match"}
+        for resume_id, score in stored.items()
+    }
+    
+    to_score = [resume_id for resume_id in shortlist_ids if resume_id not in stored]
+    for match in score_candidates(db, job, to_score):
+        candidates[match["resume_id"]] = {
+            "resume_id": match["resume_id"],
+            "score": match["score"],
+            "source": "fallback" if match["fallback"] else "llm",
+        }
+    
+    ranked = sorted(candidates.values(), key=lambda x: x["score"], reverse=True)
+    return ranked[:top_k]
+
+def profile_resume(db: Session, resume_id: int):
+    """Extract and store the structured profile used in scoring prompts"""
+    if MATCH_MODE == "local" or not get_provider().generates_text:
+        # Local scoring works on the raw text and never calls the LLM
+        return
+    resume = db.query(Resume).filter(Resume.id == resume_id).first()
+    if resume and resume.profile is None:
+        profile = extract_resume_info(resume.content)
+        # An empty profile means extraction failed, so keep scoring on the raw text
+        if serialize_profile(profile):
+            resume.profile = profile
+            db.commit()
+
+def profile_job(db: Session, job_id: int):
+    """Extract and store the job requirements used in scoring prompts"""
+    if MATCH_MODE == "local" or not get_provider().generates_text:
+        return
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if job and job.profile is None:
+        profile = extract_job_info(job.description)
+        if serialize_profile(profile):
+            # Leave updated_at alone: the profile doesn't make existing matches stale.
+            # Skip the write if the description changed while it was being extracted
+            db.query(Job).filter(Job.id == job_id, Job.description == job.description).update(
+                {"profile": profile, "updated_at": Job.updated_at}, synchronize_session=False
+            )
+            db.commit()
+
+def profile_unprofiled_jobs(db: Session):
+    """Extract profiles for every job without one, such as sample, bulk-loaded or updated jobs"""
+    if MATCH_MODE == "local" or not get_provider().generates_text:
+        return
+    last_id = 0
+    while True:
+        job_ids = [
+            row.id for row in
+            db.query(Job.id).filter(Job.profile.is_(None), Job.id > last_id).order_by(Job.id).limit(100).all()
+        ]
+        if not job_ids:
+            return
+        for job_id in job_ids:
+            try:
+                profile_job(db, job_id)
+            except Exception:
+                # Scoring falls back to the raw description
+                db.rollback()
+        last_id = job_ids[-1]
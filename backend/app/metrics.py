@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Histogram
+
+# Requests sending this header get their stage timings back in a Server-Timing response header
+TIMING_HEADER = "X-Request-Timing"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_SECONDS = Histogram(
+    "resume_matcher_request_seconds", "HTTP request latency", ["method", "handler", "status"], buckets=STAGE_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "resume_matcher_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+LLM_CALLS = Counter("resume_matcher_llm_calls_total", "Completed LLM calls", ["kind"])
+LLM_CALL_SECONDS = Histogram(
+    "resume_matcher_llm_call_seconds", "Latency of single LLM calls", ["kind"], buckets=STAGE_BUCKETS
+)
+LLM_TOKENS = Counter("resume_matcher_llm_tokens_total", "Estimated LLM tokens", ["kind", "direction"])
+LLM_ERRORS = Counter("resume_matcher_llm_errors_total", "Failed LLM calls", ["kind", "reason"])
+LLM_RETRIES = Counter("resume_matcher_llm_retries_total", "LLM calls retried after a transient error", ["kind"])
+# The fallback rate is scores{outcome="fallback"} / scores
+SCORES = Counter(
+    "resume_matcher_scores_total", "Match scores produced, by whether the model reply could be parsed", ["outcome"]
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "resume_matcher_db_pool_checkout_seconds", "Time waiting for a database connection from the pool", ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def start_request_timing() -> Dict[str, float]:
+    """Collect stage timings for the current request; returns the dict they accumulate in"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0) + seconds
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as a pipeline stage, including it in the request's breakdown when one is being collected"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
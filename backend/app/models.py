@@ -1,10 +1,39 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Text, DateTime
+import zlib
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Text, DateTime, UniqueConstraint, Index, JSON, Computed, LargeBinary, TypeDecorator
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql import func, text
 
 Base = declarative_base()
 
+# Text shorter than this is stored as plain UTF-8; compressing it saves little
+COMPRESS_MIN_BYTES = 256
+
+class CompressedText(TypeDecorator):
+    """Text stored zlib-compressed in a binary column once it passes COMPRESS_MIN_BYTES"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        data = value.encode()
+        return zlib.compress(data) if len(data) >= COMPRESS_MIN_BYTES else data
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        # Plain UTF-8 never carries a valid zlib stream and checksum, so a failed
+        # decompress means the value was stored (or migrated) uncompressed
+        if value[:1] == b"x":
+            try:
+                return zlib.decompress(value).decode()
+            except zlib.error:
+                pass
+        return value.decode()
+
 class User(Base):
     __tablename__ = "users"
     
@@ -12,17 +41,27 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Recruiters may rank every user's resumes against a job; granted directly in the database
+    is_recruiter = Column(Boolean, nullable=False, default=False, server_default=text("false"))
     created_at = Column(DateTime, server_default=func.now())
     
     resumes = relationship("Resume", back_populates="user")
 
 class Resume(Base):
     __tablename__ = "resumes"
+    __table_args__ = (
+        # Looks up a user's existing copy of an uploaded resume
+        Index("ix_resumes_user_content_hash", "user_id", "content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     filename = Column(String)
-    content = Column(Text)
+    content = Column(CompressedText)
+    # Digest of the whitespace-normalized text, used to dedupe uploads per user
+    content_hash = Column(String(64))
+    # Skills, experience and education extracted once at upload, sent to scoring prompts instead of content
+    profile = Column(JSON)
     created_at = Column(DateTime, server_default=func.now())
     
     user = relationship("User", back_populates="resumes")
@@ -30,24 +69,69 @@ class Resume(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    # Identifier from the source catalog, used to dedupe bulk loads
+    external_id = Column(String, unique=True, index=True)
     title = Column(String, index=True)
     company = Column(String, index=True)
-    location = Column(String)
+    location = Column(String, index=True)
     description = Column(Text)
+    # Weighted full-text document maintained by Postgres; never loaded unless asked for
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(company, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+        persisted=True
+    )))
+    # Requirements extracted from the description, sent to scoring prompts instead of description
+    profile = Column(JSON)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     matches = relationship("Match", back_populates="job")
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        UniqueConstraint("resume_id", "job_id", name="uq_matches_resume_job"),
+        # Serves "best matches for a resume" reads without a sort
+        Index("ix_matches_resume_score", "resume_id", text("score DESC")),
+        # Serves "best candidates for a job" reads the same way
+        Index("ix_matches_job_score", "job_id", text("score DESC")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     resume_id = Column(Integer, ForeignKey("resumes.id"))
     job_id = Column(Integer, ForeignKey("jobs.id"))
     score = Column(Float)
+    # When the score was last computed; a job updated after this makes the match stale
     created_at = Column(DateTime, server_default=func.now())
     
     resume = relationship("Resume", back_populates="matches")
-    job = relationship("Job", back_populates="matches")
\ No newline at end of file
+    job = relationship("Job", back_populates="matches")
+
+class ScoreCache(Base):
+    __tablename__ = "score_cache"
+    
+    # sha256 of the normalized resume text, job description, model name and prompt version
+    key = Column(String(64), primary_key=True)
+    score = Column(Float)
+    created_at = Column(DateTime, server_default=func.now())
+
+class MatchTask(Base):
+    __tablename__ = "match_tasks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    # pending -> running -> completed | failed
+    status = Column(String, default="pending", index=True)
+    jobs_scored = Column(Integer, default=0)
+    jobs_total = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -0,0 +1,138 @@
+import os
+import re
+import logging
+import threading
+from typing import List, Optional
+
+from backend.app.retrieval import tokenize
+from backend.app.metrics import LLM_CALLS, LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Approximate token budget for the resume and job text in one scoring prompt
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Share of the budget a job description may take; the resume gets the rest
+JOB_BUDGET_SHARE = 1 / 3
+# Bump when compaction rules change, so cached scores built on old prompts are dropped
+COMPACTION_VERSION = "1"
+
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r"^page \d+( of \d+)?$",
+        r"^\d+$",
+        r"^[\W_]+$",
+        r"^(curriculum vitae|resume|r[ée]sum[ée])$",
+        r"^references( are)? available (up)?on request\.?$",
+        r".*equal opportunity employer.*",
+        r"^(confidential|all rights reserved\.?)$",
+    )
+]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token) used for prompt budgeting"""
+    return len(text) // 4 + 1
+
+def clean_lines(text: Optional[str]) -> List[str]:
+    """
+    Collapse whitespace, drop boilerplate and repeated lines
+    Blank lines are kept (once) as section separators
+    """
+    lines = []
+    seen = set()
+    for raw_line in (text or "").splitlines():
+        line = " ".join(raw_line.split())
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        key = line.lower()
+        if key in seen or any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS):
+            continue
+        seen.add(key)
+        lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+def is_heading(line: str) -> bool:
+    return line.endswith(":") or (line.isupper() and len(line) <= 40)
+
+def split_sections(lines: List[str]) -> List[List[str]]:
+    """Group cleaned lines into sections at blank lines and heading-like lines"""
+    sections = [[]]
+    for line in lines:
+        if not line or (is_heading(line) and sections[-1]):
+            if sections[-1]:
+                sections.append([])
+            if not line:
+                continue
+        sections[-1].append(line)
+    return [section for section in sections if section]
+
+def compact_text(text: Optional[str], budget_tokens: int, focus_text: Optional[str] = None) -> str:
+    """
+    Shrink text to roughly budget_tokens
+    When it doesn't fit, the opening section is kept and the remaining sections
+    are chosen by term overlap with focus_text, then emitted in original order
+    """
+    lines = clean_lines(text)
+    cleaned = "\n".join(lines)
+    if estimate_tokens(cleaned) <= budget_tokens:
+        return cleaned
+    
+    # Headings left with nothing under them aren't worth their tokens
+    sections = [section for section in split_sections(lines) if len(section) > 1 or not is_heading(section[0])]
+    if not sections:
+        return cleaned[:budget_tokens * 4]
+    focus_terms = set(tokenize(focus_text))
+    
+    def relevance(index: int) -> float:
+        if index == 0:
+            # The opening section is usually the name, title and summary
+            return float("inf")
+        terms = tokenize(" ".join(sections[index]))
+        if not terms or not focus_terms:
+            return 0.0
+        return sum(1 for term in terms if term in focus_terms) / len(terms) ** 0.5
+    
+    chosen = []
+    used = 0
+    for index in sorted(range(len(sections)), key=relevance, reverse=True):
+        section_text = "\n".join(sections[index])
+        cost = estimate_tokens(section_text)
+        if used + cost <= budget_tokens:
+            chosen.append(index)
+            used += cost
+        elif not chosen:
+            # Nothing fits yet, so cut the best section down to the budget
+            return section_text[:budget_tokens * 4]
+    return "\n\n".join("\n".join(sections[index]) for index in sorted(chosen))
+
+def compact_match_inputs(resume_text: str, job_description: str, budget_tokens: Optional[int] = None):
+    """Compact a resume/job pair to share one prompt budget, keeping the resume sections relevant to the job"""
+    budget_tokens = budget_tokens or PROMPT_TOKEN_BUDGET
+    job = compact_text(job_description, int(budget_tokens * JOB_BUDGET_SHARE))
+    resume = compact_text(resume_text, budget_tokens - estimate_tokens(job), focus_text=job)
+    return resume, job
+
+class TokenUsage:
+    """Running totals of estimated tokens sent to and received from the LLM"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self._lock = threading.Lock()
+    
+    def record(self, kind: str, prompt: str, response_text: str):
+        prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(response_text)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.response_tokens += response_tokens
+        LLM_CALLS.labels(kind).inc()
+        LLM_TOKENS.labels(kind, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(kind, "response").inc(response_tokens)
+        logger.debug("LLM %s call: ~%d prompt tokens, ~%d response tokens", kind, prompt_tokens, response_tokens)
+
+token_usage = TokenUsage()
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+from backend.app.retrieval import BM25Index, tokenize, current_job_index
+
+# Load environment variables from .env file
+load_dotenv()
+
+# gemini (default), local, record or replay
+SCORING_PROVIDER = os.getenv("SCORING_PROVIDER", "gemini").lower()
+# Where the record provider writes responses and the replay provider reads them
+SCORING_RECORDINGS_PATH = os.getenv("SCORING_RECORDINGS_PATH", "llm_recordings.jsonl")
+# Simulated latency of replayed responses
+SCORING_REPLAY_LATENCY_MS = float(os.getenv("SCORING_REPLAY_LATENCY_MS", "0"))
+SCORING_REPLAY_JITTER_MS = float(os.getenv("SCORING_REPLAY_JITTER_MS", "0"))
+
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+
+class ScoringProvider:
+    """
+    A scoring backend. Providers that generate text answer the prompts built in
+    llm.py; providers that don't score resume/job pairs directly.
+    """
+    name = "base"
+    # Part of score cache keys, so scores from different backends never mix
+    model_name = "base"
+    generates_text = True
+    # Whether a pair's score depends only on its two texts, so it can be cached
+    cache_scores = True
+    
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+    
+    async def agenerate(self, prompt: str) -> str:
+        raise NotImplementedError
+    
+    def score(self, resume_text: str, job_description: str) -> float:
+        raise NotImplementedError
+    
+    def extract_profile(self, text: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+class GeminiProvider(ScoringProvider):
+    name = "gemini"
+    model_name = GEMINI_MODEL_NAME
+    
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def model(self):
+        # Configured on first use so the backend can start without an API key
+        with self._lock:
+            if self._model is None:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY environment variable not set. Please set this variable to use the Gemini API.")
+                genai.configure(api_key=api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+    
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+    
+    async def agenerate(self, prompt: str) -> str:
+        return (await self.model.generate_content_async(prompt)).text
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+class RecordingProvider(ScoringProvider):
+    """Passes prompts to another provider and appends every response to a JSONL file"""
+    name = "record"
+    
+    def __init__(self, inner: ScoringProvider, path: str):
+        self.inner = inner
+        self.path = path
+        self.model_name = inner.model_name
+        self._lock = threading.Lock()
+    
+    def _record(self, prompt: str, response: str):
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps({"key": prompt_key(prompt), "response": response}) + "\n")
+    
+    def generate(self, prompt: str) -> str:
+        response = self.inner.generate(prompt)
+        self._record(prompt, response)
+        return response
+    
+    async def agenerate(self, prompt: str) -> str:
+        response = await self.inner.agenerate(prompt)
+        self._record(prompt, response)
+        return response
+
+class ReplayProvider(ScoringProvider):
+    """Serves responses captured by RecordingProvider, with simulated latency and no network"""
+    name = "replay"
+    
+    def __init__(self, path: str, latency_ms: float = 0, jitter_ms: float = 0):
+        self.model_name = f"replay:{GEMINI_MODEL_NAME}"
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.responses = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses[entry["key"]] = entry["response"]
+    
+    def _delay(self) -> float:
+        return max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000 if self.jitter_ms else self.latency_ms / 1000
+    
+    def _lookup(self, prompt: str) -> str:
+        try:
+            return self.responses[prompt_key(prompt)]
+        except KeyError:
+            raise LookupError("No recorded response for this prompt")
+    
+    def generate(self, prompt: str) -> str:
+        time.sleep(self._delay())
+        return self._lookup(prompt)
+    
+    async def agenerate(self, prompt: str) -> str:
+        await asyncio.sleep(self._delay())
+        return self._lookup(prompt)
+
+# Skills recognised by the local scorer; multi-word skills are matched as token sequences
+SKILL_VOCABULARY = {
+    "python", "java", "javascript", "typescript", "go", "rust", "c++", "c#", "ruby", "php", "scala", "kotlin", "swift", "r",
+    "sql", "postgresql", "mysql", "mongodb", "redis", "elasticsearch", "spark", "hadoop", "kafka", "airflow",
+    "django", "flask", "fastapi", "react", "angular", "vue", "node.js", "redux", "html", "css", "graphql", "rest",
+    "aws", "gcp", "azure", "docker", "kubernetes", "terraform", "cloudformation", "jenkins", "linux", "git",
+    "pandas", "numpy", "scikit-learn", "tensorflow", "pytorch", "machine learning", "deep learning",
+    "data analysis", "statistics", "nlp", "computer vision", "ci/cd", "microservices", "agile", "scrum",
+    "product management", "leadership", "communication", "problem-solving", "excel", "tableau",
+}
+# Skills by their tokens, since tokenize splits names like ci/cd and scikit-learn
+_SKILL_PHRASES = {" ".join(tokenize(skill)): skill for skill in SKILL_VOCABULARY}
+_MAX_SKILL_WORDS = max(len(phrase.split()) for phrase in _SKILL_PHRASES)
+
+def extract_skills(text: str) -> List[str]:
+    """Vocabulary skills mentioned in text, in order of first mention"""
+    tokens = tokenize(text)
+    found = []
+    for start in range(len(tokens)):
+        for length in range(_MAX_SKILL_WORDS, 0, -1):
+            skill = _SKILL_PHRASES.get(" ".join(tokens[start:start + length]))
+            if skill and skill not in found:
+                found.append(skill)
+    return found
+
+# Filler words ignored when there is no job catalog to weight terms by
+STOPWORDS = frozenset("""
+a about all also an and any are as at be been but by can for from has have in into is its of on or our
+such that the their them then there these they this those to was we were what when which while who will
+with within would you your
+""".split())
+
+_UNWEIGHTED_INDEX = BM25Index([], [])
+
+def drop_stopwords(text: str) -> str:
+    return " ".join(term for term in tokenize(text) if term not in STOPWORDS)
+
+class LocalProvider(ScoringProvider):
+    """Offline lexical scorer: BM25 similarity blended with the share of the job's skills the resume covers"""
+    name = "local"
+    model_name = "local-lexical-v2"
+    generates_text = False
+    # Scores use the IDF of the current job catalog, so a cached one goes stale as jobs change
+    cache_scores = False
+    
+    def __init__(self, skill_weight: float = 0.5):
+        self.skill_weight = skill_weight
+    
+    def similarity(self, resume_text: str, job_description: str) -> float:
+        """
+        Term similarity weighted by the job catalog's IDF, so words every posting
+        uses count for little; before the job index is built, stopwords are dropped instead
+        """
+        index = current_job_index()
+        if index is None or not len(index):
+            # An empty index weighs every term the same
+            index = _UNWEIGHTED_INDEX
+            resume_text, job_description = drop_stopwords(resume_text), drop_stopwords(job_description)
+        return index.similarity(job_description, resume_text)
+    
+    def score(self, resume_text: str, job_description: str) -> float:
+        similarity = self.similarity(resume_text, job_description)
+        job_skills = set(extract_skills(job_description))
+        if not job_skills:
+            return float(similarity)
+        coverage = len(job_skills & set(extract_skills(resume_text))) / len(job_skills)
+        return float((1 - self.skill_weight) * similarity + self.skill_weight * coverage)
+    
+    def extract_profile(self, text: str) -> Dict[str, Any]:
+        return {"skills": extract_skills(text), "experience": [], "education": []}
+
+_provider: Optional[ScoringProvider] = None
+_provider_lock = threading.Lock()
+
+def create_provider(name: str) -> ScoringProvider:
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "local":
+        return LocalProvider()
+    if name == "record":
+        return RecordingProvider(GeminiProvider(), SCORING_RECORDINGS_PATH)
+    if name == "replay":
+        return ReplayProvider(SCORING_RECORDINGS_PATH, SCORING_REPLAY_LATENCY_MS, SCORING_REPLAY_JITTER_MS)
+    raise ValueError(f"Unknown SCORING_PROVIDER {name!r}; expected gemini, local, record or replay")
+
+def get_provider() -> ScoringProvider:
+    """The configured scoring provider, created on first use"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider(SCORING_PROVIDER)
+        return _provider
+
+def set_provider(provider: ScoringProvider):
+    """Swap the scoring provider at runtime, e.g. for benchmarks"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,125 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+# Client-side limits shared by every LLM call in the process; 0 disables a limit
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+
+# Per-item retries of transient failures, with jittered exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+
+# Consecutive failures that open the circuit, and how long it stays open before a trial call
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "10"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# HTTP status codes (as carried by google.api_core errors) worth retrying
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`
+    reserve() takes tokens immediately and returns how long the caller must
+    wait before using them, so sync and async callers share one bucket
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests larger than the bucket would otherwise never fit
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets reserved together"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+    def acquire(self, tokens: int):
+        time.sleep(self.reserve(tokens))
+
+    async def acquire_async(self, tokens: int):
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider while the circuit is open"""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets one trial call through and closes again if it succeeds
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give up a trial call without a verdict, e.g. when it was cancelled"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (self.failure_threshold and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection problems, quota errors and 5xx responses"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt, starting at 0"""
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+circuit_breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
@@ -0,0 +1,166 @@
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import List, Tuple, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app.models import Job, Resume
+
+# Number of jobs shortlisted for LLM scoring (0 sends every job to the LLM)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "50"))
+# "llm" reranks the shortlist with Gemini, "local" uses the retrieval scores directly
+MATCH_MODE = os.getenv("MATCH_MODE", "llm").lower()
+# Number of resumes shortlisted for LLM reranking when ranking candidates for a job
+CANDIDATE_TOP_K = int(os.getenv("CANDIDATE_TOP_K", "50"))
+# How often the background indexer checks for new resumes and rebuilds the resume index
+RESUME_INDEX_MAX_AGE_SECONDS = float(os.getenv("RESUME_INDEX_MAX_AGE_SECONDS", "60"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens, keeping things like c++, c# and node.js intact"""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+class BM25Index:
+    """
+    BM25-weighted document vectors held as a sparse CSR matrix
+    Rows are L2-normalized, so scoring a query is one sparse matrix-vector
+    product and the results are cosine similarities between 0 and 1
+    """
+    
+    def __init__(self, doc_ids: Sequence[int], texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.vocab = {}
+        rows, cols, counts = [], [], []
+        doc_lens = np.zeros(len(texts))
+        for row, text in enumerate(texts):
+            term_counts = Counter(tokenize(text))
+            doc_lens[row] = sum(term_counts.values())
+            for term, count in term_counts.items():
+                rows.append(row)
+                cols.append(self.vocab.setdefault(term, len(self.vocab)))
+                counts.append(count)
+        
+        n_docs, n_terms = len(texts), len(self.vocab)
+        tf = sparse.csr_matrix((np.asarray(counts, dtype=np.float64), (rows, cols)), shape=(n_docs, n_terms))
+        df = np.bincount(np.asarray(cols, dtype=np.int64), minlength=n_terms)
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        
+        # BM25 term-frequency saturation with document length normalization
+        avgdl = max(doc_lens.mean(), 1.0) if n_docs else 1.0
+        lens = np.repeat(doc_lens, np.diff(tf.indptr))
+        data = tf.data * (k1 + 1) / (tf.data + k1 * (1 - b + b * lens / avgdl)) * self.idf[tf.indices]
+        weights = sparse.csr_matrix((data, tf.indices, tf.indptr), shape=tf.shape)
+        
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.matrix = sparse.csr_matrix(sparse.diags(1.0 / norms) @ weights)
+    
+    def __len__(self):
+        return len(self.doc_ids)
+    
+    def query_vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.vocab))
+        term_counts = Counter(term for term in tokenize(text) if term in self.vocab)
+        for term, count in term_counts.items():
+            col = self.vocab[term]
+            vector[col] = (1 + math.log(count)) * self.idf[col]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def similarity(self, text: str, other: str) -> float:
+        """Cosine similarity of two texts weighted by this index's IDF; terms it hasn't seen count as rarest"""
+        unseen_idf = math.log1p((len(self) + 0.5) / 0.5)
+        
+        def weights(value: str):
+            return {
+                term: (1 + math.log(count)) * (self.idf[self.vocab[term]] if term in self.vocab else unseen_idf)
+                for term, count in Counter(tokenize(value)).items()
+            }
+        
+        a, b = weights(text), weights(other)
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return sum(w * b[term] for term, w in a.items() if term in b) / norm if norm else 0.0
+    
+    def scores(self, text: str) -> np.ndarray:
+        """Similarity of every indexed document to the query text"""
+        if not len(self):
+            return np.zeros(0)
+        return self.matrix @ self.query_vector(text)
+    
+    def top_k(self, text: str, k: int) -> List[Tuple[int, float]]:
+        """Best k (doc_id, score) pairs, highest score first"""
+        scores = self.scores(text)
+        if k <= 0 or k >= len(scores):
+            order = np.argsort(-scores, kind="stable")
+        else:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.doc_ids[i]), float(scores[i])) for i in order]
+
+_job_index: Optional[BM25Index] = None
+_job_index_version = None
+_job_index_lock = threading.Lock()
+
+def job_catalog_version(db: Session):
+    """Cheap fingerprint of the jobs table used to decide when to rebuild the index"""
+    return tuple(db.query(func.count(Job.id), func.max(Job.id), func.max(Job.updated_at)).one())
+
+def get_job_index(db: Session) -> BM25Index:
+    """Return the job index, rebuilding it only when the catalog has changed"""
+    global _job_index, _job_index_version
+    version = job_catalog_version(db)
+    with _job_index_lock:
+        if _job_index is None or _job_index_version != version:
+            rows = db.query(Job.id, Job.description).order_by(Job.id).all()
+            _job_index = BM25Index([row.id for row in rows], [row.description for row in rows])
+            _job_index_version = version
+        return _job_index
+
+def current_job_index() -> Optional[BM25Index]:
+    """The job index as last built, without checking the catalog; None before the first build"""
+    return _job_index
+
+def shortlist_jobs(db: Session, resume_text: str, top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Rank every job against the resume locally and keep the best top_k"""
+    return get_job_index(db).top_k(resume_text, RETRIEVAL_TOP_K if top_k is None else top_k)
+
+_resume_index: Optional[BM25Index] = None
+_resume_index_version = None
+_resume_index_lock = threading.Lock()
+
+def resume_catalog_version(db: Session):
+    """Cheap fingerprint of the resumes table; resumes are never edited, only added"""
+    return tuple(db.query(func.count(Resume.id), func.max(Resume.id)).one())
+
+def refresh_resume_index(db: Session):
+    """
+    Rebuild the resume index if the table has changed. Called by the
+    background indexer rather than requests, since a rebuild reads every
+    resume; the new index is swapped in whole once it is built
+    """
+    global _resume_index, _resume_index_version
+    with _resume_index_lock:
+        version = resume_catalog_version(db)
+        if _resume_index is None or _resume_index_version != version:
+            rows = db.query(Resume.id, Resume.content).order_by(Resume.id).all()
+            index = BM25Index([row.id for row in rows], [row.content for row in rows])
+            _resume_index_version = version
+            _resume_index = index
+
+def current_resume_index() -> Optional[BM25Index]:
+    """The resume index as last built; None until the background indexer first builds it"""
+    return _resume_index
+
+def shortlist_resumes(job_text: str, top_k: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Rank every indexed resume against the job locally and keep the best top_k"""
+    index = _resume_index
+    if index is None:
+        return []
+    return index.top_k(job_text, CANDIDATE_TOP_K if top_k is None else top_k)
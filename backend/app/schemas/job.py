@@ -1,11 +1,13 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 
 class JobBase(BaseModel):
     title: str
     company: str
     location: str = None
     description: str
+    external_id: Optional[str] = None
 
 class JobCreate(JobBase):
     pass
@@ -15,4 +17,32 @@ class Job(JobBase):
     created_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class JobSummary(BaseModel):
+    """Job without its description, for list views"""
+    id: int
+    title: str
+    company: str
+    location: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
+
+class JobListItem(JobSummary):
+    """Job summary that carries description and external_id only when requested"""
+    description: Optional[str] = None
+    external_id: Optional[str] = None
+
+class BulkJobError(BaseModel):
+    row: int
+    error: str
+
+class BulkJobResult(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int
+    errors: List[BulkJobError]
\ No newline at end of file
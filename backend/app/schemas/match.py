@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List
-from .job import Job
+from typing import List, Optional, Union
+from .job import Job, JobSummary
 from .resume import Resume
 
 class MatchBase(BaseModel):
@@ -20,9 +20,32 @@ class Match(MatchBase):
         orm_mode = True
 
 class JobMatch(BaseModel):
-    job: Job
+    job: Union[Job, JobSummary]
     score: float
 
 class ResumeMatches(BaseModel):
     resume: Resume
-    matches: List[JobMatch]
\ No newline at end of file
+    matches: List[JobMatch]
+
+class MatchTask(BaseModel):
+    id: int
+    resume_id: int
+    status: str
+    jobs_scored: int
+    jobs_total: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        orm_mode = True
+
+class Candidate(BaseModel):
+    """A resume ranked for a job"""
+    resume_id: int
+    user_id: int
+    filename: str
+    score: float
+    # "match" for a stored score, "llm" for one computed now, "retrieval" for
+    # the local index score, "fallback" when the LLM couldn't score it
+    source: str
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class ResumeBase(BaseModel):
     filename: Optional[str] = None
@@ -12,7 +12,33 @@ class Resume(ResumeBase):
     id: int
     user_id: int
     content: str
+    profile: Optional[Dict[str, Any]] = None
     created_at: datetime
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ResumeSummary(ResumeBase):
+    """Resume for list views; content and profile are only included when requested"""
+    id: int
+    user_id: int
+    created_at: datetime
+    content: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+    
+    class Config:
+        orm_mode = True
+
+class BatchResumeFile(BaseModel):
+    filename: str
+    # created, duplicate of an existing resume (given as resume_id), or failed with an error
+    status: str
+    resume_id: Optional[int] = None
+    task_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResumeResult(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    files: List[BatchResumeFile]
\ No newline at end of file
@@ -11,6 +11,7 @@ class UserCreate(UserBase):
 
 class User(UserBase):
     id: int
+    is_recruiter: bool = False
     created_at: datetime
     
     class Config:
@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.app.database import lock_engine
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers arriving while a call
+    for their key is in flight wait for it and share its result or exception
+    """
+
+    def __init__(self):
+        self._calls: Dict[Any, Future] = {}
+        self._listeners: Dict[Any, List[Callable[..., None]]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn: Callable[[Callable[..., None]], Any], on_progress: Optional[Callable[..., None]] = None):
+        """
+        Run fn(report), or join the call already running for key
+        Every caller's on_progress receives the arguments passed to report,
+        on the thread running fn, while the other callers are waiting
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._listeners[key] = []
+            if on_progress:
+                self._listeners[key].append(on_progress)
+        if not leader:
+            return future.result()
+
+        def report(*args):
+            with self._lock:
+                listeners = list(self._listeners[key])
+            for listener in listeners:
+                listener(*args)
+
+        try:
+            result = fn(report)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+                del self._listeners[key]
+
+@contextmanager
+def advisory_lock(db: Session, namespace: int, key: int):
+    """
+    Hold a Postgres session-level advisory lock on (namespace, key) for the block,
+    serialising the block across processes; a no-op on other databases
+    The lock lives on a connection from the dedicated lock pool, so commits on
+    db don't release it early and it doesn't take a second session connection
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        yield
+        return
+    with lock_engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:namespace, :key)"), {"namespace": namespace, "key": key})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:namespace, :key)"), {"namespace": namespace, "key": key})
+            conn.commit()
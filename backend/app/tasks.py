@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app.database import SessionLocal
+from backend.app.models import Resume, MatchTask
+from backend.app.matching import match_resume, fan_out_job, profile_resume, profile_job, profile_unprofiled_jobs, ensure_sample_jobs
+from backend.app.retrieval import refresh_resume_index, RESUME_INDEX_MAX_AGE_SECONDS
+
+# Number of match tasks run concurrently by this process
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+# Threads extracting profiles and fanning out new jobs; kept apart from match
+# tasks so a large batch upload doesn't queue ahead of users' matches
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", "2"))
+# Running tasks with no heartbeat for this long are assumed orphaned by a crash and requeued
+MATCH_TASK_STALE_SECONDS = int(os.getenv("MATCH_TASK_STALE_SECONDS", "120"))
+# How often each process marks its running tasks alive and sweeps for orphaned ones
+MATCH_TASK_HEARTBEAT_SECONDS = float(os.getenv("MATCH_TASK_HEARTBEAT_SECONDS", "30"))
+# Minimum interval between progress writes for a running task
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+_executor = ThreadPoolExecutor(max_workers=MATCH_WORKERS, thread_name_prefix="match-worker")
+_profile_executor = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix="profile-worker")
+
+# Tasks this process is running, kept alive by the heartbeat
+_running_tasks = set()
+_running_lock = threading.Lock()
+_stop_maintenance = threading.Event()
+
+def enqueue_match_task(db: Session, resume: Resume) -> MatchTask:
+    """Persist a pending match task for the resume and hand it to the worker pool"""
+    task = MatchTask(resume_id=resume.id, user_id=resume.user_id, status="pending")
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    submit_match_task(task.id)
+    return task
+
+def submit_match_task(task_id: int):
+    """Hand an already persisted pending task to the worker pool"""
+    _executor.submit(run_match_task, task_id)
+
+def _claim_task(db: Session, task_id: int) -> bool:
+    """Atomically move a task from pending to running so only one worker runs it"""
+    claimed = db.query(MatchTask).filter(
+        MatchTask.id == task_id,
+        MatchTask.status == "pending"
+    ).update({"status": "running"}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+def run_match_task(task_id: int):
+    db = SessionLocal()
+    try:
+        if not _claim_task(db, task_id):
+            return
+        with _running_lock:
+            _running_tasks.add(task_id)
+        task = db.query(MatchTask).filter(MatchTask.id == task_id).first()
+        resume = db.query(Resume).filter(Resume.id == task.resume_id).first()
+        if not resume:
+            task.status = "failed"
+            task.error = "Resume not found"
+            db.commit()
+            return
+        
+        if resume.profile is None:
+            try:
+                # Normally done at upload, but a match queued with the upload can get here first
+                profile_resume(db, resume.id)
+            except Exception:
+                # Scoring falls back to the raw resume text
+                db.rollback()
+        
+        last_write = 0.0
+        
+        def on_progress(scored: int, total: int):
+            nonlocal last_write
+            task.jobs_scored = scored
+            task.jobs_total = total
+            now = time.monotonic()
+            if now - last_write >= PROGRESS_INTERVAL_SECONDS or scored == total:
+                db.commit()
+                last_write = now
+        
+        match_resume(db, resume, on_progress)
+        task.status = "completed"
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        task = db.query(MatchTask).filter(MatchTask.id == task_id).first()
+        if task:
+            task.status = "failed"
+            task.error = getattr(e, "detail", None) or str(e)
+            db.commit()
+    finally:
+        with _running_lock:
+            _running_tasks.discard(task_id)
+        db.close()
+
+def run_resume_profile(resume_id: int):
+    db = SessionLocal()
+    try:
+        profile_resume(db, resume_id)
+    except Exception:
+        # Scoring falls back to the raw resume text
+        db.rollback()
+    finally:
+        db.close()
+
+def enqueue_resume_profile(resume_id: int):
+    """Extract a new resume's profile in the background"""
+    _profile_executor.submit(run_resume_profile, resume_id)
+
+def run_job_fanout(job_id: int):
+    db = SessionLocal()
+    try:
+        try:
+            # Profile first so the fan-out already scores against it
+            profile_job(db, job_id)
+        except Exception:
+            db.rollback()
+        fan_out_job(db, job_id)
+    except Exception:
+        # Resumes that were missed pick the job up on their next /match/
+        db.rollback()
+    finally:
+        db.close()
+
+def enqueue_job_fanout(job_id: int):
+    """Extract a newly added job's profile and score it against existing resumes in the background"""
+    _profile_executor.submit(run_job_fanout, job_id)
+
+def run_job_profiles():
+    db = SessionLocal()
+    try:
+        # Seed the sample catalog up front so its jobs are profiled too
+        ensure_sample_jobs(db)
+        profile_unprofiled_jobs(db)
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+def enqueue_job_profiles():
+    """Extract profiles for jobs that have none in the background, e.g. after a bulk load"""
+    _profile_executor.submit(run_job_profiles)
+
+def resume_pending_tasks():
+    """Requeue tasks left pending, or running without a heartbeat, before a restart"""
+    db = SessionLocal()
+    try:
+        requeue_stale_tasks(db)
+        pending = db.query(MatchTask.id).filter(MatchTask.status == "pending").order_by(MatchTask.id).all()
+        for (task_id,) in pending:
+            submit_match_task(task_id)
+    finally:
+        db.close()
+
+def requeue_stale_tasks(db: Session):
+    """
+    Resubmit running tasks whose process stopped sending heartbeats, and
+    pending tasks whose process died before starting them. Each task is
+    claimed with a conditional update, so only one process requeues it
+    """
+    # Compare against the database clock, which also set updated_at, whatever its time zone
+    stale_before = func.now() - timedelta(seconds=MATCH_TASK_STALE_SECONDS)
+    stale = db.query(MatchTask.id).filter(
+        MatchTask.status.in_(["pending", "running"]),
+        MatchTask.updated_at < stale_before
+    ).order_by(MatchTask.id).all()
+    for (task_id,) in stale:
+        requeued = db.query(MatchTask).filter(
+            MatchTask.id == task_id,
+            MatchTask.status.in_(["pending", "running"]),
+            MatchTask.updated_at < stale_before
+        ).update({"status": "pending", "updated_at": func.now()}, synchronize_session=False)
+        db.commit()
+        if requeued:
+            submit_match_task(task_id)
+
+def _maintain_tasks():
+    while not _stop_maintenance.wait(MATCH_TASK_HEARTBEAT_SECONDS):
+        db = SessionLocal()
+        try:
+            with _running_lock:
+                running = list(_running_tasks)
+            if running:
+                db.query(MatchTask).filter(
+                    MatchTask.id.in_(running),
+                    MatchTask.status == "running"
+                ).update({"updated_at": func.now()}, synchronize_session=False)
+                db.commit()
+            requeue_stale_tasks(db)
+        except Exception:
+            # Try again on the next beat
+            db.rollback()
+        finally:
+            db.close()
+
+def start_task_maintenance():
+    """Start the thread that heartbeats this process's tasks and requeues orphaned ones"""
+    threading.Thread(target=_maintain_tasks, name="match-task-heartbeat", daemon=True).start()
+
+def _index_resumes():
+    while True:
+        db = SessionLocal()
+        try:
+            refresh_resume_index(db)
+        except Exception:
+            # Keep serving the previous index and try again next time
+            db.rollback()
+        finally:
+            db.close()
+        if _stop_maintenance.wait(RESUME_INDEX_MAX_AGE_SECONDS):
+            return
+
+def start_resume_indexer():
+    """Start the thread that builds the resume index and rebuilds it as resumes are added"""
+    threading.Thread(target=_index_resumes, name="resume-indexer", daemon=True).start()
+
+def shutdown_workers(wait: bool = False):
+    """Stop the worker pools, dropping queued work unless wait is set"""
+    _stop_maintenance.set()
+    for executor in (_executor, _profile_executor):
+        executor.shutdown(wait=wait, cancel_futures=not wait)
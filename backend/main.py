@@ -1,21 +1,39 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Form, Query, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-import PyPDF2
-import io
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer, load_only
 from datetime import timedelta
+import os
+import json
+import time
+import logging
+import tempfile
 from typing import List, Optional
 
 # Update these imports to the new app directory structure
-from backend.app.database import get_db, engine
-from backend.app.models import Base, User, Resume, Job, Match
+from backend.app.database import get_db, get_async_db, engine
+from backend.app.models import Base, User, Resume, Job, Match, MatchTask
 from backend.app.schemas.user import UserCreate, User as UserSchema, Token
-from backend.app.schemas.resume import ResumeCreate, Resume as ResumeSchema
-from backend.app.schemas.job import JobCreate, Job as JobSchema
-from backend.app.schemas.match import MatchCreate, Match as MatchSchema, JobMatch, ResumeMatches
-from backend.app.auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
-from backend.app.llm import batch_compute_job_matches, extract_resume_info
+from backend.app.schemas.resume import ResumeCreate, Resume as ResumeSchema, ResumeSummary, BatchResumeResult
+from backend.app.schemas.job import JobCreate, Job as JobSchema, JobSummary, JobListItem, BulkJobResult
+from backend.app.schemas.match import MatchCreate, Match as MatchSchema, JobMatch, ResumeMatches, MatchTask as MatchTaskSchema, Candidate
+from backend.app.auth import authenticate_user, create_access_token, get_current_active_user, get_current_recruiter, get_password_hash_async, ACCESS_TOKEN_EXPIRE_MINUTES
+from backend.app.llm import extract_resume_info
+from backend.app.matching import match_resume, stream_match_resume, rank_candidates
+from backend.app.retrieval import current_resume_index
+from backend.app.extraction import extract_upload, extract_archive, spool_upload, shutdown_extraction_pool, MAX_BATCH_UPLOAD_BYTES
+from backend.app.ingest import ingest_jobs_file
+from backend.app.tasks import enqueue_match_task, submit_match_task, enqueue_resume_profile, enqueue_job_fanout, enqueue_job_profiles, resume_pending_tasks, start_task_maintenance, start_resume_indexer, shutdown_workers
+from backend.app.cache import text_digest
+from backend.app.metrics import REQUEST_SECONDS, TIMING_HEADER, start_request_timing, server_timing_header
+logger = logging.getLogger(__name__)
+
 # Create tables in the database
 Base.metadata.create_all(bind=engine)
 
@@ -30,10 +48,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Clients opt in to a per-request stage breakdown with the timing header
+    timings = start_request_timing() if request.headers.get(TIMING_HEADER) else None
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    
+    # Label by handler rather than path so ids in URLs don't explode the series count
+    endpoint = request.scope.get("endpoint")
+    handler = endpoint.__name__ if endpoint else "unmatched"
+    REQUEST_SECONDS.labels(request.method, handler, response.status_code).observe(elapsed)
+    if timings is not None:
+        timings["total"] = elapsed
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.on_event("startup")
+def start_match_workers():
+    # Pick up match tasks that were queued or interrupted before a restart
+    resume_pending_tasks()
+    # Keep this process's tasks alive and requeue ones orphaned by other processes
+    start_task_maintenance()
+    # Candidate ranking reads the resume index, which is only ever built here
+    start_resume_indexer()
+    # Profile jobs that were loaded or changed without one
+    enqueue_job_profiles()
+
+@app.on_event("shutdown")
+def stop_match_workers():
+    shutdown_workers()
+    shutdown_extraction_pool()
+
 # Authentication endpoints
 @app.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,21 +103,21 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 # User endpoints
 @app.post("/users/", response_model=UserSchema)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if db_user:
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User.id).where(User.username == user.username))
+    if result.first():
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    result = await db.execute(select(User.id).where(User.email == user.email))
+    if result.first():
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(username=user.username, email=user.email, hashed_password=hashed_password)
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @app.get("/users/me/", response_model=UserSchema)
@@ -74,90 +129,312 @@ def read_users_me(current_user: User = Depends(get_current_active_user)):
 async def upload_resume(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Read and extract text from the uploaded file
-    content = ""
+    # Spool the upload to disk and extract its text in the process pool
     filename = file.filename
+    content = await extract_upload(file)
+    content_hash = text_digest(content)
     
-    # Handle PDF files
-    if filename.lower().endswith('.pdf'):
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(await file.read()))
-        for page_num in range(len(pdf_reader.pages)):
-            content += pdf_reader.pages[page_num].extract_text()
-    # Handle text files
-    elif filename.lower().endswith(('.txt', '.doc', '.docx')):
-        content = (await file.read()).decode()
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file format")
+    # Re-uploading the same resume returns the stored one, keeping its profile and matches
+    result = await db.execute(
+        select(Resume).where(Resume.user_id == current_user.id, Resume.content_hash == content_hash).order_by(Resume.id)
+    )
+    existing = result.scalars().first()
+    if existing:
+        return existing
     
     # Create and save resume
     resume = Resume(
         user_id=current_user.id,
         filename=filename,
-        content=content
+        content=content,
+        content_hash=content_hash
     )
     
     db.add(resume)
-    db.commit()
-    db.refresh(resume)
+    await db.commit()
+    await db.refresh(resume)
     
+    # Extract the compact profile used by scoring prompts without blocking the upload
+    enqueue_resume_profile(resume.id)
     return resume
 
-@app.get("/resumes/", response_model=List[ResumeSchema])
-def get_user_resumes(
+# Resumes inserted per commit by batch uploads
+RESUME_INSERT_BATCH = 100
+
+@app.post("/resumes/batch", response_model=BatchResumeResult)
+async def upload_resume_batch(
+    file: UploadFile = File(...),
+    match: bool = False,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload a ZIP archive of resumes, extracted in parallel and reported per file
+    With match=true a background match task is queued for every new resume
+    Files matching a resume the user already has are reported as duplicates of it
+    """
+    if not (file.filename or "").lower().endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Batch uploads must be a ZIP archive")
+    
+    path = await spool_upload(file, MAX_BATCH_UPLOAD_BYTES)
+    try:
+        extracted = await extract_archive(path)
+    finally:
+        os.unlink(path)
+    
+    files = [
+        {"filename": item["filename"], "status": "created" if item["error"] is None else "failed", "error": item["error"]}
+        for item in extracted
+    ]
+    
+    # Files the user already uploaded, or that repeat an earlier file in the archive, reuse that resume
+    for item in extracted:
+        if item["error"] is None:
+            item["content_hash"] = text_digest(item["content"])
+    hashes = {item["content_hash"] for item in extracted if item["error"] is None}
+    known = {}
+    if hashes:
+        result = await db.execute(
+            select(Resume.content_hash, Resume.id)
+            .where(Resume.user_id == current_user.id, Resume.content_hash.in_(hashes))
+            .order_by(Resume.id.desc())
+        )
+        known = dict(result.all())
+    created = []
+    first_seen = {}
+    for entry, item in zip(files, extracted):
+        if item["error"] is not None:
+            continue
+        if item["content_hash"] in known:
+            entry["status"] = "duplicate"
+            entry["resume_id"] = known[item["content_hash"]]
+        elif item["content_hash"] in first_seen:
+            entry["status"] = "duplicate"
+            first_seen[item["content_hash"]].append(entry)
+        else:
+            first_seen[item["content_hash"]] = []
+            created.append((entry, item))
+    
+    # Insert new resumes in batches
+    for start in range(0, len(created), RESUME_INSERT_BATCH):
+        batch = created[start:start + RESUME_INSERT_BATCH]
+        resumes = [
+            Resume(user_id=current_user.id, filename=item["filename"], content=item["content"], content_hash=item["content_hash"])
+            for _, item in batch
+        ]
+        db.add_all(resumes)
+        await db.commit()
+        for (entry, item), resume in zip(batch, resumes):
+            entry["resume_id"] = resume.id
+            for duplicate in first_seen[item["content_hash"]]:
+                duplicate["resume_id"] = resume.id
+    
+    if match and created:
+        tasks = [MatchTask(resume_id=entry["resume_id"], user_id=current_user.id, status="pending") for entry, _ in created]
+        db.add_all(tasks)
+        await db.commit()
+        for (entry, _), task in zip(created, tasks):
+            entry["task_id"] = task.id
+            submit_match_task(task.id)
+    else:
+        # Match tasks extract profiles themselves; otherwise do it in the background
+        for entry, _ in created:
+            enqueue_resume_profile(entry["resume_id"])
+    
+    failed = sum(1 for entry in files if entry["status"] == "failed")
+    return BatchResumeResult(created=len(created), duplicates=len(files) - len(created) - failed, failed=failed, files=files)
+
+# Columns list endpoints leave out unless they are named in ?fields=
+RESUME_LIST_FIELDS = ("content", "profile")
+JOB_LIST_FIELDS = ("description", "external_id")
+
+def parse_fields(fields: Optional[str], allowed) -> List[str]:
+    """Opt-in columns from a comma-separated ?fields= value"""
+    requested = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}; expected any of {', '.join(allowed)}"
+        )
+    return requested
+
+@app.get("/resumes/", response_model=List[ResumeSummary], response_model_exclude_unset=True)
+async def get_user_resumes(
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    resumes = db.query(Resume).filter(Resume.user_id == current_user.id).all()
-    return resumes
+    """
+    The user's resumes without their text
+    Pass fields=content,profile (either or both) to include those columns
+    """
+    columns = ["id", "user_id", "filename", "created_at"] + parse_fields(fields, RESUME_LIST_FIELDS)
+    result = await db.execute(
+        select(Resume)
+        .where(Resume.user_id == current_user.id)
+        .options(load_only(*[getattr(Resume, column) for column in columns]))
+    )
+    # Only touch loaded columns: an async session can't lazy-load the rest
+    return [ResumeSummary(**{column: getattr(resume, column) for column in columns}) for resume in result.scalars()]
 
 @app.get("/resumes/{resume_id}", response_model=ResumeSchema)
-def get_resume(
+async def get_resume(
     resume_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
+    result = await db.execute(select(Resume).where(Resume.id == resume_id, Resume.user_id == current_user.id))
+    resume = result.scalars().first()
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     return resume
 
 # Job endpoints
 @app.post("/jobs/", response_model=JobSchema)
-def create_job(
+async def create_job(
     job: JobCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     db_job = Job(**job.dict())
     db.add(db_job)
-    db.commit()
-    db.refresh(db_job)
+    await db.commit()
+    await db.refresh(db_job)
+    
+    # Extract the job's profile and score it against existing resumes without blocking the request
+    enqueue_job_fanout(db_job.id)
     return db_job
 
-@app.get("/jobs/", response_model=List[JobSchema])
-def get_jobs(
+@app.post("/jobs/bulk", response_model=BulkJobResult)
+async def bulk_create_jobs(request: Request):
+    """
+    Load jobs from an NDJSON request body, or CSV with a header row when
+    the Content-Type is text/csv. Jobs with an external_id are upserted on it.
+    New jobs are picked up by each resume's next /match/ rather than fanned out;
+    new and changed jobs get their profiles extracted in the background.
+    """
+    fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    
+    # Spool the body to disk so memory stays bounded however large the load is
+    with tempfile.TemporaryFile() as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        result = await run_in_threadpool(ingest_jobs_file, spool, fmt)
+    if result["inserted"] or result["updated"]:
+        enqueue_job_profiles()
+    return result
+
+@app.get("/jobs/", response_model=List[JobListItem], response_model_exclude_unset=True)
+async def get_jobs(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Jobs without their descriptions
+    Pass fields=description,external_id (either or both) to include those columns
+    """
+    columns = ["id", "title", "company", "location", "created_at"] + parse_fields(fields, JOB_LIST_FIELDS)
+    result = await db.execute(
+        select(Job).options(load_only(*[getattr(Job, column) for column in columns])).offset(skip).limit(limit)
+    )
+    return [JobListItem(**{column: getattr(job, column) for column in columns}) for job in result.scalars()]
+
+@app.get("/jobs/search", response_model=List[JobSummary])
+async def search_jobs(
+    response: Response,
+    q: Optional[str] = None,
+    company: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    jobs = db.query(Job).offset(skip).limit(limit).all()
-    return jobs
+    """
+    Full-text search over job titles, companies and descriptions, best match first
+    Without q, lists jobs newest first. company and location filter on exact values
+    and may be repeated; pass the X-Next-Cursor response header back as `cursor`
+    to get the next page
+    """
+    query = select(Job.id, Job.title, Job.company, Job.location, Job.created_at)
+    if company:
+        query = query.where(Job.company.in_(company))
+    if location:
+        query = query.where(Job.location.in_(location))
+    if q:
+        ts_query = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank_cd(Job.search_vector, ts_query)
+        query = query.add_columns(rank.label("rank")).where(Job.search_vector.op("@@")(ts_query))
+        keys = [rank, Job.id]
+    else:
+        keys = [Job.id]
+    
+    # Seek past the previous page instead of OFFSET, so deep pages cost the same as the first
+    if cursor:
+        try:
+            parts = cursor.split(":")
+            if len(parts) != len(keys):
+                raise ValueError(cursor)
+            values = [float(part) for part in parts[:-1]] + [int(parts[-1])]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(*keys) < tuple_(*values))
+    rows = (await db.execute(query.order_by(*[key.desc() for key in keys]).limit(limit + 1))).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = f"{last.rank}:{last.id}" if q else str(last.id)
+    return [JobSummary(id=row.id, title=row.title, company=row.company, location=row.location, created_at=row.created_at) for row in rows]
 
 @app.get("/jobs/{job_id}", response_model=JobSchema)
-def get_job(
+async def get_job(
     job_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/candidates", response_model=List[Candidate])
+def get_job_candidates(
+    job_id: int,
+    top_k: int = Query(10, ge=1, le=100),
+    rerank: bool = True,
+    current_user: User = Depends(get_current_recruiter),
     db: Session = Depends(get_db)
 ):
+    """
+    Best resumes across all users for a job, ranked by match score; recruiters only
+    Set rerank=false to rank by the local resume index alone, without LLM calls
+    """
     job = db.query(Job).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job
+    if current_resume_index() is None:
+        raise HTTPException(status_code=503, detail="Resume index is still being built, try again shortly")
+    
+    ranked = rank_candidates(db, job, top_k, rerank)
+    resumes = {
+        row.id: row for row in
+        db.query(Resume.id, Resume.user_id, Resume.filename).filter(Resume.id.in_([c["resume_id"] for c in ranked])).all()
+    }
+    return [
+        Candidate(resume_id=c["resume_id"], user_id=resumes[c["resume_id"]].user_id,
+                  filename=resumes[c["resume_id"]].filename, score=c["score"], source=c["source"])
+        for c in ranked if c["resume_id"] in resumes
+    ]
 
 # Match endpoints
-@app.post("/match/", response_model=ResumeMatches)
+@app.post("/match/", response_model=ResumeMatches, responses={202: {"model": MatchTaskSchema}})
 def match_resume_to_jobs(
     resume_id: int,
+    background: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -166,63 +443,22 @@ def match_resume_to_jobs(
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
         
-    # Check if we have any jobs, if not create some sample jobs
-    if db.query(Job).count() == 0:
-        sample_jobs = [
-            {
-                "title": "Software Engineer",
-                "description": "Looking for a software engineer with experience in Python, FastAPI, and PostgreSQL. Must have strong problem-solving skills and experience with RESTful APIs.",
-                "company": "Tech Corp"
-            },
-            {
-                "title": "Data Scientist",
-                "description": "Seeking a data scientist with experience in machine learning, Python, and data analysis. Must have experience with pandas, numpy, and scikit-learn.",
-                "company": "Data Insights"
-            },
-            {
-                "title": "DevOps Engineer",
-                "description": "Looking for a DevOps engineer with experience in Docker, Kubernetes, and CI/CD pipelines. Must have experience with cloud platforms like AWS or GCP.",
-                "company": "Cloud Solutions"
-            }
-        ]
-        for job_data in sample_jobs:
-            job = Job(**job_data)
-            db.add(job)
-        db.commit()
-    
-    # Get all jobs
-    jobs = db.query(Job).all()
-    job_data = [{"id": job.id, "description": job.description} for job in jobs]
-    
-    # Compute matches using LLM
-    matches = batch_compute_job_matches(resume.content, job_data)
-    
-    # Store matches in database
-    for match in matches:
-        # Check if match already exists
-        existing_match = db.query(Match).filter(
-            Match.resume_id == resume_id, 
-            Match.job_id == match["job_id"]
-        ).first()
-        
-        if existing_match:
-            # Update existing match
-            existing_match.score = match["score"]
-        else:
-            # Create new match
-            db_match = Match(
-                resume_id=resume_id,
-                job_id=match["job_id"],
-                score=match["score"]
-            )
-            db.add(db_match)
+    if background:
+        # Queue the match and let the client poll /match/tasks/{id} for progress
+        task = enqueue_match_task(db, resume)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(MatchTaskSchema.model_validate(task, from_attributes=True))
+        )
     
-    db.commit()
+    matches = match_resume(db, resume)
     
     # Get top 5 matching jobs
     top_matches = []
-    for match in matches[:5]:  # Limit to top 5
-        job = db.query(Job).filter(Job.id == match["job_id"]).first()
+    top_jobs = matches[:5]  # Limit to top 5
+    jobs = {job.id: job for job in db.query(Job).filter(Job.id.in_([match["job_id"] for match in top_jobs])).all()}
+    for match in top_jobs:
+        job = jobs.get(match["job_id"])
         if job:
             # Convert ORM model to dictionary to fix the validation error
             job_dict = {
@@ -253,36 +489,137 @@ def match_resume_to_jobs(
         resume=resume_dict,  # Pass the dictionary instead of the ORM model
         matches=top_matches
     )
-    
-@app.get("/matches/{resume_id}", response_model=List[JobMatch])
-def get_resume_matches(
+
+# Media type of streamed match events for clients that don't ask for Server-Sent Events
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def format_event(event: str, data: dict, sse: bool) -> str:
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+@app.post("/match/stream")
+def stream_match_resume_to_jobs(
     resume_id: int,
+    request: Request,
+    top_k: int = Query(5, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    # Verify resume belongs to user
+    """
+    Stream a resume's match scores as they are computed, then the ranked top_k matches
+    Sends Server-Sent Events to clients accepting text/event-stream and NDJSON otherwise
+    Events: `match` per scored job, then `done` with the ranking, or `error`
+    """
     resume = db.query(Resume).filter(Resume.id == resume_id, Resume.user_id == current_user.id).first()
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
+    sse = "text/event-stream" in request.headers.get("accept", "")
     
-    # Get matches
-    matches = db.query(Match).filter(Match.resume_id == resume_id).order_by(Match.score.desc()).all()
+    def events():
+        matches = []
+        jobs = {}
+        
+        def load_jobs(job_ids: List[int]):
+            # One query for every job that can be streamed, instead of one per match
+            rows = db.query(Job.id, Job.title, Job.company, Job.location, Job.created_at).filter(Job.id.in_(job_ids)).all()
+            jobs.update({row.id: row for row in rows})
+        
+        try:
+            for match in stream_match_resume(db, resume, load_jobs):
+                job = jobs.get(match["job_id"])
+                matches.append(match)
+                yield format_event("match", {
+                    "job_id": match["job_id"],
+                    "title": job.title if job else None,
+                    "company": job.company if job else None,
+                    "location": job.location if job else None,
+                    "score": match["score"],
+                    "fallback": match["fallback"],
+                }, sse)
+        except HTTPException as e:
+            yield format_event("error", {"detail": e.detail}, sse)
+            return
+        except Exception:
+            logger.exception("Streaming match of resume %s failed", resume_id)
+            yield format_event("error", {"detail": "Matching failed"}, sse)
+            return
+        
+        matches.sort(key=lambda x: x["score"], reverse=True)
+        top_matches = [
+            JobMatch(job=JobSummary.model_validate(jobs[match["job_id"]], from_attributes=True), score=match["score"])
+            for match in matches[:top_k] if jobs.get(match["job_id"])
+        ]
+        yield format_event("done", {"total": len(matches), "matches": jsonable_encoder(top_matches)}, sse)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else NDJSON_MEDIA_TYPE,
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/match/tasks/{task_id}", response_model=MatchTaskSchema)
+async def get_match_task(
+    task_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    result = await db.execute(select(MatchTask).where(MatchTask.id == task_id, MatchTask.user_id == current_user.id))
+    task = result.scalars().first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Match task not found")
+    return task
+    
+@app.get("/matches/{resume_id}", response_model=List[JobMatch])
+async def get_resume_matches(
+    resume_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_description: bool = True,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Matches for a resume, best first, one page at a time
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page
+    """
+    # Verify resume belongs to user
+    result = await db.execute(select(Resume.id).where(Resume.id == resume_id, Resume.user_id == current_user.id))
+    if not result.first():
+        raise HTTPException(status_code=404, detail="Resume not found")
+    
+    # Get matches and their jobs in one query, seeking past the previous page
+    query = select(Match.id, Match.score, Job).join(Job, Job.id == Match.job_id).where(Match.resume_id == resume_id)
+    if not include_description:
+        query = query.options(defer(Job.description))
+    if cursor:
+        try:
+            cursor_score, cursor_id = cursor.split(":")
+            query = query.where(tuple_(Match.score, Match.id) < tuple_(float(cursor_score), int(cursor_id)))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = (await db.execute(query.order_by(Match.score.desc(), Match.id.desc()).limit(limit + 1))).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = f"{rows[-1].score}:{rows[-1].id}"
     
     # Build response
     result = []
-    for match in matches:
-        job = db.query(Job).filter(Job.id == match.job_id).first()
-        if job:
-            # Convert ORM model to dictionary
-            job_dict = {
-                "id": job.id,
-                "title": job.title,
-                "company": job.company,
-                "description": job.description,
-                "location": "Remote",
-                # Add any other fields required by your Job schema
-                "created_at": job.created_at if hasattr(job, 'created_at') else None
-            }
-            result.append(JobMatch(job=job_dict, score=match.score))
+    for match_id, score, job in rows:
+        # Convert ORM model to dictionary
+        job_dict = {
+            "id": job.id,
+            "title": job.title,
+            "company": job.company,
+            "location": "Remote",
+            # Add any other fields required by your Job schema
+            "created_at": job.created_at if hasattr(job, 'created_at') else None
+        }
+        if include_description:
+            job_dict["description"] = job.description
+        result.append(JobMatch(job=job_dict, score=score))
     
-    return result
\ No newline at end of file
+    return result
@@ -1,4 +1,5 @@
 import requests
+import json
 import time
 import os
 
@@ -165,16 +166,26 @@ def seed_data():
         print(f"Error logging in: {str(e)}")
         return
     
-    # Add jobs
-    for job in sample_jobs:
-        try:
-            response = requests.post(f"{API_URL}/jobs/", json=job)
-            if response.status_code == 200:
-                print(f"Created job: {job['title']}")
-            else:
-                print(f"Failed to create job: {response.json()}")
-        except Exception as e:
-            print(f"Error creating job: {str(e)}")
+    # Add jobs in one bulk request, keyed on external ids so re-seeding doesn't duplicate them
+    try:
+        body = "\n".join(
+            json.dumps({**job, "external_id": f"seed-{index}"})
+            for index, job in enumerate(sample_jobs, 1)
+        )
+        response = requests.post(
+            f"{API_URL}/jobs/bulk",
+            data=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        if response.status_code == 200:
+            result = response.json()
+            print(f"Loaded jobs: {result['inserted']} created, {result['updated']} updated, {result['unchanged']} unchanged")
+            for error in result["errors"]:
+                print(f"Failed to create job in row {error['row']}: {error['error']}")
+        else:
+            print(f"Failed to create jobs: {response.json()}")
+    except Exception as e:
+        print(f"Error creating jobs: {str(e)}")
     
     print("Seeding completed!")
 
@@ -4,10 +4,15 @@ import json
 import pandas as pd
 from io import StringIO
 import os
+import time
 #include sql imports 
 
 # Backend API URL
 API_URL = os.getenv("API_URL", "http://localhost:8000")
+# Seconds between polls of a queued match task
+MATCH_POLL_INTERVAL = float(os.getenv("MATCH_POLL_INTERVAL", "1.0"))
+# Stop waiting for a background match after this long; it keeps running on the server
+MATCH_POLL_TIMEOUT = float(os.getenv("MATCH_POLL_TIMEOUT", "600"))
 
 # Page config
 st.set_page_config(
@@ -100,16 +105,57 @@ def get_user_resumes():
     except Exception:
         return []
 
+def wait_for_match_task(task):
+    """Poll a queued match task until it finishes, showing its progress"""
+    progress_bar = st.progress(0.0, text="Waiting for matching to start...")
+    deadline = time.monotonic() + MATCH_POLL_TIMEOUT
+    while task["status"] in ("pending", "running"):
+        if time.monotonic() > deadline:
+            progress_bar.empty()
+            st.warning("Matching is taking longer than expected. Check back later for your matches.")
+            return False
+        time.sleep(MATCH_POLL_INTERVAL)
+        try:
+            task_response = requests.get(
+                f"{API_URL}/match/tasks/{task['id']}",
+                headers={"Authorization": f"Bearer {st.session_state.token}"},
+                timeout=30
+            )
+        except requests.RequestException as e:
+            progress_bar.empty()
+            st.error(f"Failed to check matching progress: {e}")
+            return False
+        if task_response.status_code != 200:
+            progress_bar.empty()
+            st.error(f"Failed to check matching progress: {task_response.text}")
+            return False
+        
+        task = task_response.json()
+        if task["jobs_total"]:
+            progress_bar.progress(
+                min(task["jobs_scored"] / task["jobs_total"], 1.0),
+                text=f"Scored {task['jobs_scored']} of {task['jobs_total']} jobs"
+            )
+    
+    progress_bar.empty()
+    if task["status"] == "failed":
+        st.error(f"Matching failed: {task.get('error') or 'Unknown error'}")
+        return False
+    return True
+
 def match_resume(resume_id):
     try:
-        # First try to get matches from the GET endpoint instead
+        # Queue the match in the background and poll its task instead of blocking
         post_response = requests.post(
-            f"{API_URL}/match/?resume_id={resume_id}",
+            f"{API_URL}/match/?resume_id={resume_id}&background=true",
             headers={"Authorization": f"Bearer {st.session_state.token}"}
         )
         
-        if post_response.status_code == 200:
-            # After successful POST, get the matches using GET endpoint
+        if post_response.status_code == 202:
+            if not wait_for_match_task(post_response.json()):
+                return False
+            
+            # After matching completes, get the matches using GET endpoint
             get_response = requests.get(
                 f"{API_URL}/matches/{resume_id}",
                 headers={"Authorization": f"Bearer {st.session_state.token}"}
@@ -140,6 +186,47 @@ def match_resume(resume_id):
         st.error(f"Error during matching: {str(e)}")
         return False
 
+def stream_matches(resume_id):
+    """Match a resume through the streaming endpoint, showing each scored job as it arrives"""
+    progress = st.empty()
+    table = st.empty()
+    rows = []
+    try:
+        with requests.post(
+            f"{API_URL}/match/stream?resume_id={resume_id}",
+            headers={"Authorization": f"Bearer {st.session_state.token}", "Accept": "application/x-ndjson"},
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                st.error(f"Matching failed with status code {response.status_code}: {response.text}")
+                return False
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["event"] == "match":
+                    rows.append({
+                        "Job ID": event["job_id"],
+                        "Title": event["title"],
+                        "Company": event["company"],
+                        "Location": event["location"],
+                        "Match Score": event["score"]
+                    })
+                    progress.caption(f"Scored {len(rows)} jobs...")
+                    df = pd.DataFrame(rows).sort_values("Match Score", ascending=False)
+                    table.dataframe(df.style.format({"Match Score": "{:.2%}"}), use_container_width=True)
+                elif event["event"] == "error":
+                    progress.empty()
+                    st.error(f"Matching failed: {event['detail']}")
+                    return False
+                elif event["event"] == "done":
+                    progress.caption(f"Scored {event['total']} jobs")
+        return True
+    except Exception as e:
+        st.error(f"Error during matching: {str(e)}")
+        return False
+
 def get_job_details(job_id):
     try:
         response = requests.get(
@@ -250,6 +337,17 @@ def main():
         with tab2:
             st.header("Job Matches")
             
+            if st.session_state.current_resume:
+                if st.button("Match and show results as they arrive"):
+                    if stream_matches(st.session_state.current_resume["id"]):
+                        # Reload the stored matches so the job details below are up to date
+                        get_response = requests.get(
+                            f"{API_URL}/matches/{st.session_state.current_resume['id']}",
+                            headers={"Authorization": f"Bearer {st.session_state.token}"}
+                        )
+                        if get_response.status_code == 200:
+                            st.session_state.job_matches = get_response.json()
+            
             if st.session_state.job_matches:
                 # Display job matches in a table
                 match_data = []